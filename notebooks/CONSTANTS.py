@@ -1 +0,0 @@
-Mitchel = False
\ No newline at end of file
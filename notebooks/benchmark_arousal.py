@@ -0,0 +1,38 @@
+## Microbenchmark of the arousal feature: compares compute_arousal from features.py with the original row-wise pandas implementation
+## Run from the notebooks directory with: python benchmark_arousal.py
+import timeit
+import pandas as pd
+import numpy as np
+from src.features import features as ft
+
+
+def compute_arousal_pandas(video_data: pd.DataFrame) -> dict:
+    """The original implementation of compute_arousal, which selects the 5 FAUs with the most intensity frame by frame using pd.Series.nlargest."""
+    processed = {} # Create the dict to store the results
+    AU_cols = [col for col in video_data.columns if col.startswith('AU') and col.endswith('_r') and '45' not in col] # Get all the columns that reflect intensity (_r) FAUs except FAU45
+    df = video_data[AU_cols] - video_data[AU_cols].rolling(60*25, min_periods=1).mean() # Normalise the FAU intensity based on the previous 60 seconds mean intensity
+    df[df<0] = 0 # Set all negative intensities to zero
+    processed['mean_Arousal'] = (df.apply(pd.Series.nlargest, axis=1, n=5)).mean(axis=1).mean() # Compute the arousal as the mean on the 5 FAUs with the most intensity
+    return processed # Return the results in a dict
+
+
+def create_AU_frames(seconds: int, seed: int = 0) -> pd.DataFrame:
+    """Creates a DataFrame with random FAU intensities at 25 fps, in which 5% of the frames are set to NaN like the low confidence frames in notebook 4."""
+    rng = np.random.default_rng(seed) # Random number generator, seeded so every run uses the same frames
+    frames = seconds*25 # The amount of frames in the window
+    AUs = ['01', '02', '04', '05', '06', '07', '09', '10', '12', '14', '15', '17', '20', '23', '25', '26', '45'] # The FAUs that OpenFace computes an intensity for
+    data = pd.DataFrame({f'AU{AU}_r': np.clip(rng.normal(1, 1, frames), 0, 5) for AU in AUs}) # Intensities between 0 and 5
+    data.loc[rng.random(frames) < 0.05, :] = np.nan # Set the low confidence frames to NaN
+    return data # Return the DataFrame
+
+
+if __name__ == '__main__':
+    for seconds in [60*3, 60*5]: # The window sizes used in notebook 4
+        data = create_AU_frames(seconds)
+        old = compute_arousal_pandas(data)['mean_Arousal']
+        new = ft.compute_arousal(data)['mean_Arousal']
+        assert np.isclose(old, new, rtol=1e-9), f'Results differ: {old} vs {new}' # Both implementations need to give the same arousal
+
+        time_old = min(timeit.repeat(lambda: compute_arousal_pandas(data), number=1, repeat=3)) # Best of 3 runs of the pandas implementation
+        time_new = min(timeit.repeat(lambda: ft.compute_arousal(data), number=10, repeat=3)) / 10 # Best of 3 runs of the NumPy implementation
+        print(f'Window of {seconds} seconds ({len(data)} frames): pandas {time_old*1000:.1f} ms, numpy {time_new*1000:.2f} ms, speedup {time_old/time_new:.0f}x')
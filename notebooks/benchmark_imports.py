@@ -0,0 +1,85 @@
+## Import-time benchmark of the feature and target code: imports each module in a fresh Python process (as a worker of the process pool or a CLI would) and
+## times its cold start. Run from the notebooks directory with: python benchmark_imports.py
+## Importing a module should not scan the data directories (which are often on the network share) and should not import the heavy packages that are only
+## needed by some functions (NeuroKit2, SciPy, scikit-learn, tqdm and matplotlib), see src/features/paths.py and targetComputation.get_neurokit.
+## The time of a module is the best wall time of --repeat fresh processes, so it includes starting Python itself. As a reference, the time of an empty
+## process and of a process that only imports pandas are printed as well. A module that takes longer than --budget seconds, that imports a heavy package
+## or that lists a directory is reported, and the script then exits with status 1. With --output the results are stored as JSON.
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+MODULES = ['src.features.paths', 'src.features.eyeGeometry', 'src.features.features', 'src.features.slidingFeatures', 'src.features.profiling',
+           'src.features.targetComputation', 'windowing', 'windowCache', 'signalStore', 'featureStore', 'sampling'] # The modules that are imported by the workers and scripts
+HEAVY = ['neurokit2', 'scipy.signal', 'sklearn', 'tqdm', 'matplotlib'] # The packages that may only be imported when they are used
+REFERENCES = {'python': 'pass', 'pandas': 'import pandas'} # The reference imports, only timed
+BUDGET = 1.5 # The default cold start budget of a module in seconds
+
+# The code that is run in the fresh process: it records every directory that is listed and every heavy package that is imported during the import,
+# and prints them as JSON
+CHILD = '''
+import os, sys, json, time, importlib
+scans = []
+def record(function):
+    def wrapper(path='.'):
+        scans.append(os.fspath(path))
+        return function(path)
+    return wrapper
+os.listdir, os.scandir = record(os.listdir), record(os.scandir)
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+import_time = time.perf_counter() - start
+print(json.dumps({'import': import_time, 'scans': scans, 'heavy': [name for name in sys.argv[2:] if name in sys.modules]}))
+'''
+
+
+def time_process(code: str, args: list, cwd: str) -> tuple:
+    """Runs code in a fresh Python process from cwd, with cwd and the project dir on the path. Returns the wall time of the process and its output."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([cwd, os.path.dirname(cwd), os.environ.get('PYTHONPATH', '')]))
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code] + args, cwd=cwd, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f'{" ".join(args) or code} failed:\n{result.stderr}')
+    return wall, result.stdout
+
+
+def benchmark_module(module: str, repeat: int, cwd: str) -> dict:
+    """Imports a module in repeat fresh processes. Returns the best wall time of a process and of the import itself, the listed directories and the
+    imported heavy packages.
+    """
+    runs = [time_process(CHILD, [module] + HEAVY, cwd) for _ in range(repeat)]
+    reports = [json.loads(output.strip().splitlines()[-1]) for _, output in runs] # The last line of the output is the report of the child
+    return {'wall': min(wall for wall, _ in runs), 'import': min(report['import'] for report in reports),
+            'scans': reports[0]['scans'], 'heavy': reports[0]['heavy']}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Times the cold start of the feature and target modules in fresh processes.')
+    parser.add_argument('--budget', type=float, default=BUDGET, help='The maximal cold start (wall time of the process) of a module in seconds')
+    parser.add_argument('--repeat', type=int, default=5, help='The amount of fresh processes per module, the best time is kept')
+    parser.add_argument('--only', help='Only time the modules whose name contains this text')
+    parser.add_argument('--output', help='A JSON file to store the results in')
+    args = parser.parse_args()
+    cwd = os.path.dirname(os.path.abspath(__file__)) # The notebooks directory, so its scripts can be imported
+
+    references = {name: min(time_process(code, [], cwd)[0] for _ in range(args.repeat)) for name, code in REFERENCES.items()}
+    print(' '.join(f'{name}: {wall:.3f}s' for name, wall in references.items()) + f' (budget {args.budget:.3f}s)')
+    results, failed = {}, [] # Create a dict to store the results of each module in, and a list for the modules that break a rule
+    for module in [module for module in MODULES if args.only is None or args.only in module]:
+        results[module] = result = benchmark_module(module, args.repeat, cwd)
+        problems = (['over budget'] if result['wall'] > args.budget else []) + [f'imports {name}' for name in result['heavy']] + \
+                   [f'lists {path}' for path in result['scans']]
+        print(f"{module:34s} {result['wall']:.3f}s (import {result['import']:.3f}s)" + (f"  <- {', '.join(problems)}" if problems else ''))
+        if problems:
+            failed.append(module)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'budget': args.budget, 'references': references, 'modules': results}, file, indent=1)
+    if failed:
+        print(f'{len(failed)} modules broke the import rules: {", ".join(failed)}')
+        sys.exit(1)
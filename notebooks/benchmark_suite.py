@@ -0,0 +1,155 @@
+## Benchmark suite of the feature and target computation: times each feature function (features.py and slidingFeatures.py), each target function
+## (targetComputation.py) and sampling a full participant (sampling.sample_pp) at several window and step sizes, on synthetic data (see syntheticData.py).
+## Run from the notebooks directory with: python benchmark_suite.py
+## It needs no study data and no network, so it can run on any machine with the packages of the notebooks installed. The results are stored as JSON
+## (default `benchmark_results.json`), with for each benchmark the best and median time of one call and the throughput (frames, samples or windows per second).
+## With --baseline the results are compared with an earlier results file: a benchmark that is more than --tolerance slower is reported, and the script
+## then exits with status 1, so a slowdown can be caught before a full cohort is rerun. Use --quick for a short run and --only to select benchmarks by name.
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import warnings
+import tempfile
+import pandas as pd
+import numpy as np
+import syntheticData as sd
+from src.features import targetComputation as tc
+from src.features import features as ft
+from src.features import slidingFeatures as sf
+from src.features import paths
+import sampling
+from windowing import get_bounds
+
+FEATURE_FUNCTIONS = ['compute_mean_AUs', 'compute_std_AUs', 'compute_arousal', 'compute_emotions', 'compute_head_motion', 'compute_PD_features', 'compute_blink_rate'] # The per window feature functions of features.py
+SLIDING_FUNCTIONS = ['compute_mean_AUs', 'compute_std_AUs', 'compute_emotions', 'compute_head_motion', 'compute_PD_features', 'compute_blink_rate'] # The per window feature functions of slidingFeatures.py
+TARGET_FUNCTIONS = ['compute_EDA_Targets', 'compute_ECG_Targets'] # The per window target functions of targetComputation.py
+CONFIGS = [(60, 30), (180, 60), (300, 150)] # The (window size, step size) in seconds of the sample_pp benchmarks
+SAMPLING_MODES = {'per_window': {'incremental': False, 'physio_once': False}, 'prepared': {'incremental': True, 'physio_once': True}} # The ways in which sample_pp computes the windows
+MIN_TIME = 0.2 # The minimal time (in seconds) of one timed run, fast functions are called several times per run
+
+
+def time_function(function, repeat: int) -> dict:
+    """Times a function: the first call warms up and decides how many calls make one run of at least MIN_TIME, the best and median of repeat runs are kept.
+    Returns a dict with the best and median time of one call (in seconds), the calls per run and the amount of runs.
+    """
+    start = time.perf_counter()
+    function() # The first call also fills the caches, such as the baseline statistics
+    first = time.perf_counter() - start
+    number = max(1, int(np.ceil(MIN_TIME / max(first, 1e-9)))) if first < MIN_TIME else 1
+    times = [] # Create a list to store the time of each run in
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    return {'best': min(times), 'median': float(np.median(times)), 'number': number, 'repeat': repeat}
+
+
+def get_benchmarks(video: pd.DataFrame, physio: pd.DataFrame, configs: list) -> list:
+    """Creates the benchmarks on a synthetic participant. Returns a list of (name, function, items, unit) tuples, where items is the amount of frames,
+    samples or windows that one call of the function processes (to compute the throughput).
+    """
+    benchmarks = [] # Create a list to store the benchmarks in
+    prepared_video = sf.prepare_video(sampling.mask_frames(video)) # Prepared once, outside of the timing of the per window functions
+    prepared_physio = tc.prepare_physio(physio)
+    benchmarks.append(('slidingFeatures.prepare_video', lambda: sf.prepare_video(video), len(video), 'frames'))
+    benchmarks.append(('targetComputation.prepare_physio', lambda: tc.prepare_physio(physio), len(physio), 'samples'))
+
+    for window_size in sorted(set(window_size for window_size, _ in configs)): # The per window functions, on a window in the middle of the recording
+        start = video.t_from_start.values[0] + (video.t_from_start.values[-1] - video.t_from_start.values[0] - window_size) / 2
+        (video_lower,), (video_upper,) = get_bounds(video.t_from_start.values, [(start, start + window_size)])
+        (physio_lower,), (physio_upper,) = get_bounds(physio.t_from_start.values, [(start, start + window_size)])
+        video_window, physio_window = video.iloc[video_lower:video_upper], physio.iloc[physio_lower:physio_upper]
+        for name in FEATURE_FUNCTIONS:
+            benchmarks.append((f'features.{name}[window={window_size}s]', lambda f=getattr(ft, name), w=video_window: f(w), len(video_window), 'frames'))
+        for name in SLIDING_FUNCTIONS:
+            benchmarks.append((f'slidingFeatures.{name}[window={window_size}s]', lambda f=getattr(sf, name), l=video_lower, u=video_upper: f(prepared_video, l, u), video_upper - video_lower, 'frames'))
+        for name in TARGET_FUNCTIONS:
+            benchmarks.append((f'targetComputation.{name}[window={window_size}s]', lambda f=getattr(tc, name), w=physio_window: f(w), len(physio_window), 'samples'))
+            benchmarks.append((f'targetComputation.{name}_prepared[window={window_size}s]', lambda f=getattr(tc, f'{name}_prepared'), l=physio_lower, u=physio_upper: f(prepared_physio, l, u), physio_upper - physio_lower, 'samples'))
+
+    pp = int(video.pp.values[0])
+    for window_size, step_size in configs: # A full participant, in each way of computing the windows
+        n_windows = len(sampling.get_start_end(video, window_size, step_size))
+        for mode, kwargs in SAMPLING_MODES.items():
+            benchmarks.append((f'sampling.sample_pp[window={window_size}s,step={step_size}s,{mode}]', lambda w=window_size, s=step_size, k=kwargs: sampling.sample_pp(pp, physio, video, w, s, **k), n_windows, 'windows'))
+    return benchmarks
+
+
+def run_benchmarks(benchmarks: list, repeat: int) -> dict:
+    """Runs each benchmark (see get_benchmarks). Returns a dict with the timing (see time_function), items, unit and throughput of each benchmark."""
+    results = {} # Create a dict to store the results of each benchmark in
+    for name, function, items, unit in benchmarks:
+        result = time_function(function, repeat)
+        results[name] = {**result, 'items': int(items), 'unit': unit, 'throughput': items / result['best']}
+        print(f"{name:<75} {result['best']*1000:>10.2f} ms {results[name]['throughput']:>16,.1f} {unit}/s")
+    return results
+
+
+def compare_results(results: dict, baseline: dict, tolerance: float) -> dict:
+    """Compares the best time of each benchmark with that of the baseline results. A benchmark is 'slower' when its time is more than tolerance above the baseline,
+    'faster' when it is more than tolerance below it, and 'ok' otherwise. Returns a dict with the baseline and current time, their ratio and the status of each benchmark in both results.
+    """
+    comparison = {} # Create a dict to store the comparison of each benchmark in
+    for name in results:
+        if name not in baseline:
+            continue
+        ratio = results[name]['best'] / baseline[name]['best']
+        status = 'slower' if ratio > 1 + tolerance else 'faster' if ratio < 1 / (1 + tolerance) else 'ok'
+        comparison[name] = {'baseline': baseline[name]['best'], 'current': results[name]['best'], 'ratio': ratio, 'status': status}
+    return comparison
+
+
+def get_environment() -> dict:
+    """Gets the versions of Python and the packages, and the machine the benchmarks ran on, which are stored with the results."""
+    import scipy, neurokit2
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__, 'scipy': scipy.__version__, 'neurokit2': neurokit2.__version__,
+            'platform': platform.platform(), 'processor': platform.processor(), 'cpu_count': os.cpu_count()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Times the feature and target computation on synthetic data.')
+    parser.add_argument('--output', default='benchmark_results.json', help='The JSON file to store the results in')
+    parser.add_argument('--baseline', help='A results file of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='How much slower than the baseline a benchmark may be (0.2 is 20%%)')
+    parser.add_argument('--seconds', type=float, default=600, help='The length of the synthetic recordings in seconds')
+    parser.add_argument('--repeat', type=int, default=3, help='The amount of timed runs of each benchmark')
+    parser.add_argument('--only', help='Only run the benchmarks whose name contains this text')
+    parser.add_argument('--quick', action='store_true', help='A short run: recordings of 5 minutes, one run per benchmark and only the first two configs')
+    parser.add_argument('--seed', type=int, default=0, help='The seed of the synthetic data')
+    args = parser.parse_args()
+    seconds, repeat, configs = (300, 1, CONFIGS[:2]) if args.quick else (args.seconds, args.repeat, CONFIGS)
+
+    pd.set_option('mode.chained_assignment', None) # Set this options to avoid annoying warnings (Not necessary)
+    warnings.filterwarnings('ignore') # NeuroKit2 warns about HRV indices that need longer windows than the benchmarks use
+    pp = 1 # The id of the synthetic participant
+    video = sd.create_video(seconds, pp, args.seed)
+    physio = sd.create_physio(seconds, pp, args.seed)
+    with tempfile.TemporaryDirectory() as data_dir:
+        sd.create_baseline_files(data_dir, [pp], args.seed)
+        paths.set_data_dir(data_dir) # The baseline statistics are read from the synthetic files
+        benchmarks = [benchmark for benchmark in get_benchmarks(video, physio, configs) if args.only is None or args.only in benchmark[0]]
+        results = run_benchmarks(benchmarks, repeat)
+
+    output = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'environment': get_environment(),
+              'settings': {'seconds': seconds, 'repeat': repeat, 'configs': configs, 'seed': args.seed}, 'benchmarks': results}
+    slower = []
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        output['comparison'] = compare_results(results, baseline['benchmarks'], args.tolerance)
+        output['comparison_baseline'] = os.path.abspath(args.baseline)
+        print(f'\nCompared with {args.baseline} (tolerance {args.tolerance:.0%}):')
+        for name, comparison in output['comparison'].items():
+            print(f"{name:<75} {comparison['baseline']*1000:>10.2f} ms -> {comparison['current']*1000:>10.2f} ms ({comparison['ratio']:.2f}x) {comparison['status']}")
+        slower = [name for name, comparison in output['comparison'].items() if comparison['status'] == 'slower']
+
+    with open(args.output, 'w') as file:
+        json.dump(output, file, indent=1)
+    print(f'\nResults stored in {args.output}')
+    if slower:
+        print(f'{len(slower)} benchmark(s) slower than the baseline: ' + ', '.join(slower))
+        sys.exit(1)
@@ -0,0 +1,62 @@
+## Compares the physio target variables of the per window pipeline (compute_EDA_Targets & compute_ECG_Targets) with those of the pipeline that
+## processes the recording of a participant once (prepare_physio & compute_*_Targets_prepared), and times both.
+## Run from the notebooks directory with: python compare_physio_targets.py
+## The targets of both pipelines are stored side by side in `data\processed\physio_target_comparison.csv`.
+import os
+import time
+import pandas as pd
+import numpy as np
+from src.features import targetComputation as tc
+from src.features import paths
+from windowing import sort_on_time, get_start_end, get_window_bounds
+
+WINDOW_SIZE = 60*3 # The window size in seconds
+STEP_SIZE = 60 # The step size in seconds
+TARGETS = ['mean_SCL', 'standardised_mean_scl', 'frequency_NS_SCR', 'HRV_MeanNN', 'HRV_RMSSD', 'HRV_SDNN', 'HRV_SDNN_corrected'] # The targets to compare
+
+
+def compare_pp(physio_data: pd.DataFrame) -> tuple:
+    """Computes the targets of all windows of one participant with both pipelines. Returns a list of dicts (one per window) and the time each pipeline took."""
+    physio_data = sort_on_time(physio_data) # Make sure the physio DataFrame is ordered in time
+    points = get_start_end(physio_data, WINDOW_SIZE, STEP_SIZE) # Get the windows based on the physio DataFrame
+    lower, upper = get_window_bounds(physio_data, points) # Get the bounds of the windows
+
+    start = time.perf_counter()
+    per_window = [{**tc.compute_EDA_Targets(physio_data.iloc[l:u]), **tc.compute_ECG_Targets(physio_data.iloc[l:u])} for l, u in zip(lower, upper)] # Process every window on its own
+    time_per_window = time.perf_counter() - start
+
+    start = time.perf_counter()
+    prepared = tc.prepare_physio(physio_data) # Process the recording once
+    once = [{**tc.compute_EDA_Targets_prepared(prepared, l, u), **tc.compute_ECG_Targets_prepared(prepared, l, u)} for l, u in zip(lower, upper)]
+    time_once = time.perf_counter() - start
+
+    rows = [] # Create a list to store the targets of both pipelines for each window
+    for (window_start, window_end), a, b in zip(points, per_window, once):
+        row = {'pp': prepared['pp'], 'start': window_start, 'end': window_end}
+        for target in TARGETS:
+            row[f'{target}_per_window'] = float(a[target])
+            row[f'{target}_once'] = float(b[target])
+        rows.append(row)
+    return rows, time_per_window, time_once
+
+
+if __name__ == '__main__':
+    physio_dir = paths.get_dir('physio')
+    pps = sorted([int(file[:-8]) for file in paths.list_files('physio', '.feather')]) # Get all the participants with a physio DataFrame
+
+    rows, time_per_window, time_once = [], 0, 0
+    for pp in pps: # For each participant
+        pp_rows, pp_time_per_window, pp_time_once = compare_pp(pd.read_feather(os.path.join(physio_dir, f'{pp}.feather')))
+        rows += pp_rows
+        time_per_window += pp_time_per_window
+        time_once += pp_time_once
+        print(f'pp{pp} done: per window {pp_time_per_window:.1f} s, once {pp_time_once:.1f} s')
+
+    df = pd.DataFrame(rows)
+    df.to_csv(paths.get_dir('processed') / 'physio_target_comparison.csv', index=False) # Store the targets of both pipelines
+
+    ## Summarise the differences between both pipelines for each target
+    print(f'\n{len(df)} windows of {len(pps)} participants. Per window: {time_per_window:.1f} s, once: {time_once:.1f} s, speedup {time_per_window/time_once:.1f}x\n')
+    for target in TARGETS:
+        a, b = df[f'{target}_per_window'], df[f'{target}_once']
+        print(f'{target:>22}: mean absolute difference {np.mean(np.abs(a - b)):.4g} (per window mean {a.mean():.4g}), correlation {a.corr(b):.4f}')
@@ -0,0 +1,158 @@
+## Import the necessary packages
+import os
+import json
+import shutil
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+
+## The functions in this script store the sampled windows of `4-ak-window-sampling` (one row per window, with its features, targets and pp id) in a feature store,
+## partitioned by window configuration, with a file per column group:
+##     store_dir/window_180_step_180/header.json, store_dir/window_180_step_180/windows.feather, store_dir/window_180_step_180/demographics.feather, ...
+## The features and targets are stored as float32 (the time columns as float64) and the pp id as a categorical. Each file is an Arrow IPC (feather) file,
+## which pandas can still read with pd.read_feather. The windows of a participant are a contiguous block of rows, which starts at its offset in the header.
+## The files are opened as memory maps: reading a few columns, or the windows of a few participants, only reads those columns and rows from disk,
+## without deserialising and copying the whole file. New columns (e.g. the outlier flag and demographics of `5-ak-window-processing`) are stored as a
+## new column group next to the windows, in the same row order, so the existing files are never rewritten. The small header holds the participants, the
+## first row of each participant, the columns of each group and their dtype, and is written last, so a partition without a header is not complete.
+
+BASE_GROUP = 'windows' # The column group written by write_windows, the other groups are added with append_columns
+TIME_COLUMNS = ['start', 'end', 't_start_physio', 't_end_physio', 't_start_video', 't_end_video'] # The columns that keep their full precision
+
+
+def get_partition_dir(store_dir: str, window_size: int, step_size: int) -> str:
+    """Returns the directory of the partition of a window and step size in the feature store."""
+    return os.path.join(store_dir, f'window_{window_size}_step_{step_size}')
+
+
+def read_header(partition_dir: str) -> dict:
+    """Reads the header of a partition in the feature store."""
+    with open(os.path.join(partition_dir, 'header.json')) as f:
+        return json.load(f)
+
+
+def write_header(partition_dir: str, header: dict):
+    """Writes the header of a partition, replacing the old one at once."""
+    with open(os.path.join(partition_dir, 'header.json.tmp'), 'w') as f:
+        json.dump(header, f, indent=1)
+    os.replace(os.path.join(partition_dir, 'header.json.tmp'), os.path.join(partition_dir, 'header.json'))
+
+
+def list_partitions(store_dir: str) -> list:
+    """Returns the (window size, step size) of every complete partition in the feature store, sorted."""
+    partitions = [] # Create a list to store the window and step size of each partition in
+    for name in os.listdir(store_dir) if os.path.isdir(store_dir) else []:
+        if os.path.exists(os.path.join(store_dir, name, 'header.json')):
+            header = read_header(os.path.join(store_dir, name))
+            partitions.append((header['window_size'], header['step_size']))
+    return sorted(partitions)
+
+
+def to_table(data: pd.DataFrame) -> pa.Table:
+    """Converts a DataFrame to an Arrow table with the dtypes of the feature store: floats as float32 (except the time columns) and pp as a categorical of ints."""
+    columns = {} # Create a dict to store the converted columns in
+    for col in data.columns:
+        values = data[col].values
+        if col == 'pp': # The pp id is stored as a string by sample_windows
+            values = pd.Categorical(values.astype('int64'))
+        elif values.dtype.kind == 'f':
+            values = values.astype('float64' if col in TIME_COLUMNS else 'float32')
+        columns[col] = values
+    return pa.Table.from_pandas(pd.DataFrame(columns), preserve_index=False).combine_chunks() # One chunk, so every slice is one record batch
+
+
+def write_group(partition_dir: str, group: str, table: pa.Table):
+    """Writes a column group of a partition as an Arrow IPC file with a single record batch, so each column is read back as one contiguous array."""
+    path = os.path.join(partition_dir, f'{group}.feather')
+    with pa.OSFile(path + '.tmp', 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(path + '.tmp', path)
+
+
+def get_row_ranges(header: dict, pps: list) -> list:
+    """Gets the (start, stop) rows of the windows of the given participants, with the ranges of participants that are next to each other merged."""
+    pps = set(int(pp) for pp in pps)
+    ranges = [] # Create a list to store the ranges in
+    for pp, start, stop in zip(header['pps'], header['offsets'][:-1], header['offsets'][1:]):
+        if pp not in pps:
+            continue
+        if ranges and ranges[-1][1] == start: # Continue the range of the previous participant
+            ranges[-1] = (ranges[-1][0], stop)
+        else:
+            ranges.append((start, stop))
+    return ranges
+
+
+def write_windows(store_dir: str, data: pd.DataFrame, window_size: int, step_size: int):
+    """Writes the sampled windows of a window and step size to the feature store, as a new partition. The windows are grouped per participant, in the order
+    in which the participants first occur. An existing partition of the same window and step size is replaced, including its appended columns.
+    """
+    pp = data.pp.values.astype('int64')
+    pps = pd.unique(pp) # The participants in the order in which they occur
+    order = np.argsort(pd.Categorical(pp, categories=pps).codes, kind='stable') # Group the windows per participant, keeping their order within a participant
+    data = data.iloc[order].reset_index(drop=True)
+    offsets = np.concatenate(([0], np.cumsum(pd.Series(pp[order]).value_counts(sort=False).reindex(pps).values))) # The first row of each participant
+
+    partition_dir = get_partition_dir(store_dir, window_size, step_size)
+    if os.path.isdir(partition_dir): # The appended columns would no longer line up with the new windows
+        shutil.rmtree(partition_dir)
+    os.makedirs(partition_dir)
+    table = to_table(data)
+    write_group(partition_dir, BASE_GROUP, table)
+    header = {'window_size': int(window_size), 'step_size': int(step_size), 'rows': len(data), 'pps': [int(p) for p in pps], 'offsets': [int(o) for o in offsets],
+              'groups': {BASE_GROUP: list(data.columns)}, 'columns': {field.name: str(field.type) for field in table.schema}}
+    write_header(partition_dir, header)
+
+
+def append_columns(store_dir: str, window_size: int, step_size: int, group: str, data: pd.DataFrame):
+    """Adds the columns of data to a partition as a column group, without rewriting the other groups. The rows of data need to be in the order of the
+    windows in the store (as returned by read_windows without pps or drop). Appending a group again replaces its columns.
+    """
+    partition_dir = get_partition_dir(store_dir, window_size, step_size)
+    header = read_header(partition_dir)
+    taken = {col for name, cols in header['groups'].items() if name != group for col in cols} # The columns of the other groups
+    if group == BASE_GROUP or len(data) != header['rows'] or taken.intersection(data.columns):
+        raise ValueError(f'Can not append {list(data.columns)} with {len(data)} rows as group {group} to a partition with {header["rows"]} rows and the columns {sorted(taken)}')
+    table = to_table(data.reset_index(drop=True))
+    write_group(partition_dir, group, table)
+    for col in header['groups'].get(group, []): # The columns of the group that is replaced
+        header['columns'].pop(col, None)
+    header['groups'][group] = list(data.columns)
+    header['columns'].update({field.name: str(field.type) for field in table.schema})
+    write_header(partition_dir, header)
+
+
+def read_group(partition_dir: str, group: str, ranges: list = None) -> pa.Table:
+    """Opens a column group as a memory map and returns the rows in the (start, stop) ranges (all rows if None) as an Arrow table, without reading the values from disk."""
+    table = pa.ipc.open_file(pa.memory_map(os.path.join(partition_dir, f'{group}.feather'))).read_all() # The arrays point into the memory map
+    if ranges is None:
+        return table
+    return pa.concat_tables([table.slice(start, stop - start) for start, stop in ranges]) if ranges else table.slice(0, 0) # The slices are views as well
+
+
+def read_windows(store_dir: str, window_size: int, step_size: int, columns: list = None, pps: list = None, drop: str = None) -> pd.DataFrame:
+    """Reads the windows of a window and step size from the feature store. Only the given columns (all if None) and the windows of the given participants
+    (all if None) are read. The windows for which the boolean column drop is True are left out (e.g. drop='is_outlier').
+    Returns a DataFrame with the columns in the given order, float32 features and a categorical pp.
+    """
+    partition_dir = get_partition_dir(store_dir, window_size, step_size)
+    header = read_header(partition_dir)
+    columns = list(columns) if columns is not None else [col for cols in header['groups'].values() for col in cols]
+    needed = columns + ([drop] if drop is not None and drop not in columns else [])
+    missing = [col for col in needed if col not in header['columns']]
+    if missing:
+        raise KeyError(f'The columns {missing} are not in the feature store')
+    ranges = None if pps is None else get_row_ranges(header, pps) # The rows of the participants
+
+    arrays = {} # Create a dict to store the column of each requested column in
+    for group, group_cols in header['groups'].items():
+        wanted = [col for col in group_cols if col in needed]
+        if wanted: # Only the groups with requested columns are opened
+            table = read_group(partition_dir, group, ranges)
+            arrays.update({col: table.column(col) for col in wanted})
+    table = pa.Table.from_arrays([arrays[col] for col in needed], names=needed)
+    if drop is not None:
+        table = table.filter(pa.array(~table.column(drop).to_pandas().fillna(False).values.astype(bool))) # Only the windows that are kept are converted to pandas
+    table = pa.Table.from_arrays(table.columns[:len(columns)], names=columns) # Without the drop column, when it was not requested
+    return table.to_pandas(split_blocks=True) # Every column is its own block, so the columns are not copied into one 2D block
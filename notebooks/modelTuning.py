@@ -0,0 +1,147 @@
+## Import the necessary packages
+import time
+import pandas as pd
+import numpy as np
+from joblib import Parallel, delayed, cpu_count
+from sklearn.model_selection import GroupKFold, ParameterGrid
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import ElasticNet, enet_path
+from sklearn.preprocessing import StandardScaler
+from sklearn.pipeline import make_pipeline
+from sklearn.compose import TransformedTargetRegressor
+
+## The functions in this script tune the hyperparameters of the ElasticNet and RandomForest models of `6-ak-modelling.ipynb`, as faster alternatives to GridSearchCV.
+## The cross validation folds are split on participant (GroupKFold) once, and reused for every target and model. Within each fold the features and
+## the target are standardised with the mean and standard deviation of the training part of the fold only, so the validation windows do not leak into
+## the scaler. For each l1_ratio the whole path of alphas is then fitted at once (enet_path), starting from the largest alpha and using the coefficients
+## of the previous alpha as the starting point of the next one (warm starts), with the Gram matrix of the fold (X^T X) computed once for all fits.
+
+ALPHAS = [0.1, 1, 10, 100, 1000, 10000] # The default alphas to tune
+L1_RATIOS = [0.01, 0.1, 0.5, 0.9, 0.99] # The default l1_ratios to tune
+
+
+def get_group_folds(groups, n_splits: int = 10) -> list:
+    """Splits the windows in n_splits folds, so the windows of a participant (groups) are all in the same fold. Returns a list of (train, validation) positions, which can be passed as cv to GridSearchCV."""
+    groups = np.asarray(groups)
+    return list(GroupKFold(n_splits=n_splits).split(np.zeros((len(groups), 1)), groups=groups)) # GroupKFold only looks at the groups
+
+
+def prepare_folds(X, folds: list) -> list:
+    """Standardises the features of each fold with a scaler fitted on the training part of the fold, and computes its Gram matrix. Returns a list with a dict for each fold."""
+    X = np.asarray(X, dtype=float)
+    prepared = [] # Create a list to store the prepared folds in
+    for train, validation in folds:
+        scaler = StandardScaler().fit(X[train]) # Only the training windows of the fold are used to fit the scaler
+        X_train = np.asfortranarray(scaler.transform(X[train])) # Coordinate descent works on the columns of X
+        prepared.append({'train': train, 'validation': validation, 'X_train': X_train, 'X_validation': scaler.transform(X[validation]),
+                         'gram': X_train.T @ X_train}) # The Gram matrix is reused for every alpha, l1_ratio and target
+    return prepared # Return the list of prepared folds
+
+
+def tune_elasticnet(prepared_folds: list, y, alphas: list = ALPHAS, l1_ratios: list = L1_RATIOS, max_iter: int = 10000, tol: float = 1e-4) -> tuple:
+    """Finds the alpha and l1_ratio with the highest mean R squared over the folds (see prepare_folds), like GridSearchCV with an ElasticNet does.
+    Returns the best parameters (dict), the best mean R squared and a DataFrame with the mean and std R squared of every combination (in the order of GridSearchCV).
+    """
+    y = np.asarray(y, dtype=float)
+    path_alphas = np.sort(alphas)[::-1] # The path is fitted from the largest to the smallest alpha
+    scores = np.zeros((len(prepared_folds), len(alphas), len(l1_ratios))) # The R squared of each fold, alpha and l1_ratio
+    for i, fold in enumerate(prepared_folds):
+        y_train, y_validation = y[fold['train']], y[fold['validation']]
+        mean, std = y_train.mean(), y_train.std() # The target is standardised like the features, with the training part of the fold only
+        std = std if std > 0 else 1
+        y_train, y_validation = (y_train - mean) / std, (y_validation - mean) / std
+        Xy = fold['X_train'].T @ y_train # Reused for every l1_ratio
+        for k, l1_ratio in enumerate(l1_ratios):
+            _, coefs, _ = enet_path(fold['X_train'], y_train, l1_ratio=l1_ratio, alphas=path_alphas, precompute=fold['gram'], Xy=Xy, max_iter=max_iter, tol=tol) # Fit all alphas with warm starts
+            predictions = fold['X_validation'] @ coefs # The predictions of every alpha at once, the intercept is 0 since the training data is centred
+            residual = ((y_validation[:, None] - predictions)**2).sum(axis=0)
+            total = ((y_validation - y_validation.mean())**2).sum()
+            r2 = 1 - residual / total # The R squared of every alpha on the validation windows
+            scores[i, :, k] = r2[np.searchsorted(-path_alphas, -np.asarray(alphas))] # Back to the order of alphas
+
+    results = pd.DataFrame([{'alpha': alpha, 'l1_ratio': l1_ratio, 'mean_R_squared': scores[:, j, k].mean(), 'std_R_squared': scores[:, j, k].std()}
+                            for j, alpha in enumerate(alphas) for k, l1_ratio in enumerate(l1_ratios)]) # The same order as the candidates of GridSearchCV
+    best = results.mean_R_squared.values.argmax() # The first combination with the highest score, like GridSearchCV
+    best_params = {'alpha': results.alpha.values[best], 'l1_ratio': results.l1_ratio.values[best]}
+    return best_params, results.mean_R_squared.values[best], results
+
+
+def make_elasticnet(alpha: float, l1_ratio: float, max_iter: int = 10000) -> TransformedTargetRegressor:
+    """Creates an ElasticNet model that standardises the features and the target with the windows it is fitted on, and predicts the target in its original unit."""
+    return TransformedTargetRegressor(regressor=make_pipeline(StandardScaler(), ElasticNet(alpha=alpha, l1_ratio=l1_ratio, max_iter=max_iter, random_state=0)), transformer=StandardScaler())
+
+
+## The functions below tune the hyperparameters of the RandomForest models with successive halving, which searches a much larger space than the grid in the same time.
+## All candidates are first scored with a small budget (a few trees, or the windows of a few participants), after which only the best 1/factor of them
+## go to the next round, with a budget factor times larger, until the last round uses the full budget. The folds are the same participant folds as above.
+## All (candidate, fold) fits of a round run at the same time in threads (the trees are built without the GIL), and when a round has less fits than cores
+## the trees of each forest are built in parallel as well.
+
+RF_SPACE = {'max_depth': [None, 4, 7, 10, 15],
+            'min_samples_split': [2, 5, 10, 20],
+            'min_samples_leaf': [1, 3, 10],
+            'max_features': [0.1, 0.3, 0.5, 0.7, 0.9]} # The hyperparameter space of the RandomForest models, which includes the original grid
+
+
+def get_fold_data(X, y, folds: list) -> list:
+    """Copies the training and validation windows of each fold once, as the float32 arrays the trees are built on. Returns a list with a dict for each fold."""
+    X, y = np.asarray(X, dtype='float32'), np.asarray(y, dtype=float)
+    return [{'X_train': X[train], 'y_train': y[train], 'X_validation': X[validation], 'y_validation': y[validation]} for train, validation in folds]
+
+
+def get_budgets(max_budget: float, min_budget: float, n_candidates: int, factor: int) -> list:
+    """Computes the budget of each round: the last round uses max_budget, each round before it a factor less, with at least min_budget.
+    There are just enough rounds to bring the candidates down to at most factor in the last round.
+    """
+    n_rounds = max(1, int(np.ceil(np.log(n_candidates) / np.log(factor)))) # The rounds needed to go from n_candidates to at most factor candidates
+    n_rounds = min(n_rounds, int(np.floor(np.log(max_budget / min_budget) / np.log(factor))) + 1) # Less rounds if the first budget would be below min_budget
+    return [max_budget / factor**(n_rounds - 1 - i) for i in range(n_rounds)]
+
+
+def fit_forest(fold: dict, params: dict, budget: float, resource: str, n_estimators: int, n_jobs: int, random_state: int) -> tuple:
+    """Fits a RandomForest with the given hyperparameters and budget on the training windows of a fold, and scores it on its validation windows.
+    Returns the fit time, score time and R squared.
+    """
+    X, y = fold['X_train'], fold['y_train']
+    if resource == 'n_samples': # The budget is the fraction of the training windows, a random but fixed subset
+        rows = np.random.RandomState(random_state).permutation(len(y))[:max(2, int(round(budget * len(y))))]
+        X, y = X[rows], y[rows]
+    else: # The budget is the amount of trees
+        n_estimators = int(round(budget))
+    start = time.perf_counter()
+    forest = RandomForestRegressor(n_estimators=n_estimators, n_jobs=n_jobs, random_state=random_state, **params).fit(X, y)
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    score = forest.score(fold['X_validation'], fold['y_validation']) # The R squared on the validation windows, like GridSearchCV
+    return fit_time, time.perf_counter() - start, score
+
+
+def tune_forest(fold_data: list, space: dict = RF_SPACE, resource: str = 'n_estimators', n_estimators: int = 5000, min_budget: float = None,
+                factor: int = 3, n_jobs: int = -1, random_state: int = 0) -> tuple:
+    """Finds the RandomForest hyperparameters in space with the highest mean R squared over the folds (see get_fold_data) with successive halving.
+    The resource of the budget is either 'n_estimators' (the amount of trees, from min_budget to n_estimators) or 'n_samples' (the fraction of the
+    training windows of each fold, from min_budget to 1, with n_estimators trees). min_budget is 20 trees or 5% of the windows by default. Returns the best parameters (dict), their mean R squared in the last round
+    and a DataFrame with the budget, mean and std R squared and mean fit and score time of every candidate in every round.
+    """
+    candidates = list(ParameterGrid(space)) # All the combinations of the hyperparameter space
+    max_budget = n_estimators if resource == 'n_estimators' else 1
+    min_budget = min_budget or (20 if resource == 'n_estimators' else 0.05)
+    n_cores = cpu_count() if n_jobs == -1 else n_jobs
+    alive = list(range(len(candidates))) # The candidates in the current round
+
+    rows = [] # Create a list to store the results of each candidate and round in
+    for i, budget in enumerate(get_budgets(max_budget, min_budget, len(candidates), factor)):
+        n_fits = len(alive) * len(fold_data)
+        forest_jobs = max(1, n_cores // n_fits) # Build the trees of each forest in parallel when there are less fits than cores
+        fits = Parallel(n_jobs=min(n_cores, n_fits), prefer='threads')(delayed(fit_forest)(fold, candidates[c], budget, resource, n_estimators, forest_jobs, random_state)
+                                                                     for c in alive for fold in fold_data)
+        fits = np.array(fits).reshape(len(alive), len(fold_data), 3) # The fit time, score time and R squared of each candidate and fold
+        for c, candidate_fits in zip(alive, fits):
+            rows.append({'round': i, 'candidate': c, 'budget': budget, **{f'param_{name}': value for name, value in candidates[c].items()},
+                         'mean_R_squared': candidate_fits[:, 2].mean(), 'std_R_squared': candidate_fits[:, 2].std(),
+                         'mean_fit_time': candidate_fits[:, 0].mean(), 'mean_score_time': candidate_fits[:, 1].mean()})
+        order = np.argsort(-fits[:, :, 2].mean(axis=1), kind='stable') # The candidates from best to worst, the first one wins a tie like GridSearchCV
+        best_score = fits[order[0], :, 2].mean()
+        alive = [alive[j] for j in order[:max(1, int(np.ceil(len(alive) / factor)))]] # Only the best 1/factor of the candidates go to the next round
+
+    return candidates[alive[0]], best_score, pd.DataFrame(rows)
@@ -0,0 +1,68 @@
+## Import the necessary packages
+import pandas as pd
+import numpy as np
+from src.features.features import AUS, FPS
+from src.features.eyeGeometry import LANDMARK_COLUMNS
+
+## The functions in this script load the csv files that OpenFace FeatureExtraction creates (see `raw-video-extraction.py`), as used in the notebook
+## `2-ak-video-dataframe.ipynb`. With all outputs turned on these files have ~700 columns, which pandas would all read in as float64 at once.
+## Instead the files are read in chunks, only the requested columns are kept and each column is stored in the smallest dtype that holds its values.
+
+PRESENCE_ONLY_AUS = ['28'] # The FAUs of which OpenFace only computes the presence (_c), next to the FAUs in features.AUS
+
+## The columns that are used to compute the features (see features.py), together with the columns that are needed to synchronise the video and physio DataFrames.
+## The FAU and eye landmark columns are built from the constants of features.py and eyeGeometry.py, so the loader keeps every column the features use
+FEATURE_COLUMNS = (['frame', 'face_id', 'timestamp', 'confidence', 'success'] + ['pose_Tx', 'pose_Ty', 'pose_Tz', 'pose_Rx', 'pose_Ry', 'pose_Rz'] + LANDMARK_COLUMNS +
+                   [f'AU{AU}_r' for AU in AUS] + [f'AU{AU}_c' for AU in sorted(AUS + PRESENCE_ONLY_AUS)])
+
+
+def get_dtype(col: str) -> str:
+    """Returns the dtype in which a column of an OpenFace csv file is stored: int8 for the flags, int32 for the frame number, float64 for the timestamp and float32 for the rest."""
+    if col in ['face_id', 'success'] or (col.startswith('AU') and col.endswith('_c')): # The face id, whether the face was tracked and whether a FAU is present
+        return 'int8'
+    if col == 'frame': # The frame number
+        return 'int32'
+    if col == 'timestamp': # The timestamp is compared with the starting point of the TSST, so it keeps its full precision
+        return 'float64'
+    return 'float32' # The confidence, FAU intensities, gaze, head pose, landmarks and shape parameters are written with at most 6 decimals
+
+
+def read_header(path: str) -> list:
+    """Reads the column names of an OpenFace csv file, without the blank spaces OpenFace puts in front of them. Returns these in a list."""
+    with open(path) as f:
+        return [col.strip(' ') for col in f.readline().rstrip('\n').split(',')]
+
+
+def load_openface_csv(path: str, pp: int, start: float, columns: list = None, chunksize: int = 5000) -> pd.DataFrame:
+    """Loads an OpenFace csv file in chunks of rows, keeping only the given columns (all columns if None) in narrow dtypes.
+    Adds the pp id and the columns `started`, `frames_away_start` and `t_from_start`, given the second in the video where the TSST speech component starts.
+    Returns the DataFrame of the participant.
+    """
+    header = read_header(path) # Get the column names of the file
+    columns = header if columns is None else [col for col in header if col in columns] # Keep the columns in the order of the file
+    dtypes = {col: get_dtype(col) for col in columns} # The dtype of each column
+
+    chunks = [] # Create a list to store the processed chunks in
+    frame_at_start = None # The frame in which the participant started the TSST speech component, which is not known until the chunk that contains it is read
+    pending = [] # The chunks that were read before that frame was found
+    reader = pd.read_csv(path, header=0, names=header, usecols=columns, dtype=dtypes, skipinitialspace=True, chunksize=chunksize) # Read the file in chunks
+    for chunk in reader:
+        chunk = chunk[columns] # usecols does not keep the order of the columns
+        chunk['pp'] = np.int16(pp) # Add the pp id
+        ## Add a column `started` which is 0 for the rows when the pp did not yet start the TSST speech, and 1 if the pp did start
+        chunk['started'] = (chunk.timestamp.values >= start).astype('int8')
+
+        if frame_at_start is None and chunk.started.values.any(): # If this chunk contains the frame in which the participant started
+            frame_at_start = chunk.frame.values[chunk.started.values.argmax()] # Get the first frame in which the participant started
+        pending.append(chunk)
+        if frame_at_start is not None: # Once the starting frame is known, the pending chunks can be completed
+            for chunk in pending:
+                ## Add a column `frames_away_start` & `t_from_start` to denote how far each row is from the frame in which the pp started the TSST speech component
+                chunk['frames_away_start'] = chunk.frame.values - frame_at_start # Compute how far away each frame is from this starting frame
+                chunk['t_from_start'] = chunk.frames_away_start.values / FPS # Compute how many seconds each frame is from the starting point
+                chunks.append(chunk)
+            pending = []
+
+    if frame_at_start is None: # The participant never started the TSST speech component in this video
+        raise ValueError(f'The video of pp{pp} does not reach the start of the TSST speech component ({start} s)')
+    return pd.concat(chunks, ignore_index=True) # Combine the chunks into one DataFrame
@@ -0,0 +1,133 @@
+## Import the necessary packages
+import os
+import json
+import time
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+## The functions in this script run OpenFace FeatureExtraction on all the videos in a directory, as done by `raw-video-extraction.py`.
+## Several videos are processed at the same time, each by its own OpenFace process. Every video is extracted into its own temporary directory,
+## and only when OpenFace finished successfully are its output files moved (renamed) into the output directory, so an interrupted run never
+## leaves a half written csv file behind. The status of each video is stored in a manifest (a json file in the output directory), together
+## with the time the extraction took and the amount of frames per second, so a new run skips the videos that are done and retries the others.
+## The csv files of videos that were extracted before the manifest existed are added to the manifest as done (see import_existing), when they are complete.
+
+MANIFEST = 'extraction_manifest.json' # The name of the manifest file in the output directory
+OPENFACE_ARGS = ['-2Dfp', '-3Dfp', '-pdmparams', '-pose', '-aus', '-gaze', '-hogalign'] # The outputs OpenFace needs to extract
+
+
+def load_manifest(out_dir: str) -> dict:
+    """Reads in the manifest of the output directory. Returns a dict with for each video a dict of its status, or an empty dict if there is no manifest yet."""
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(out_dir: str, manifest: dict):
+    """Writes the manifest to the output directory, through a temporary file so the manifest is never half written."""
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + '.tmp', path) # Replace the old manifest in one step
+
+
+def count_frames(csv_path: str) -> int:
+    """Counts the amount of frames (rows without the header) in an OpenFace csv file."""
+    with open(csv_path, 'rb') as f:
+        return sum(1 for _ in f) - 1
+
+
+def is_complete(csv_path: str) -> bool:
+    """Checks if an OpenFace csv file is complete: it has at least one frame and ends with a newline, so OpenFace was not interrupted while writing a row."""
+    if not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0:
+        return False
+    with open(csv_path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n' and count_frames(csv_path) > 0
+
+
+def import_existing(videos: list, out_dir: str, manifest: dict) -> list:
+    """Adds the videos that are not in the manifest yet, but whose complete csv file is already in out_dir (extracted before the manifest existed),
+    to the manifest as done, so they are not extracted again. Returns the imported videos.
+    """
+    imported = [] # Create a list to store the imported videos in
+    for video in videos:
+        csv_path = os.path.join(out_dir, os.path.splitext(video)[0] + '.csv')
+        if video not in manifest and is_complete(csv_path):
+            manifest[video] = {'status': 'done', 'imported': True, 'frames': count_frames(csv_path)}
+            imported.append(video)
+    return imported
+
+
+def extract_video(executable: list, video_path: str, out_dir: str, args: list = OPENFACE_ARGS) -> dict:
+    """Runs OpenFace on one video in a temporary directory and moves the output files into out_dir when it finished successfully.
+    Returns a dict with the status ('done' or 'failed'), the elapsed time in seconds, the amount of frames and the frames per second.
+    """
+    name = os.path.splitext(os.path.basename(video_path))[0] # OpenFace names its output files after the video
+    temp_dir = os.path.join(out_dir, f'.{name}.tmp') # The temporary directory of this video
+    shutil.rmtree(temp_dir, ignore_errors=True) # Remove the leftovers of an interrupted run
+    os.makedirs(temp_dir)
+
+    start = time.time()
+    result = subprocess.run(executable + ['-f', video_path, '-out_dir', temp_dir] + args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE) # Run OpenFace
+    elapsed = time.time() - start
+
+    csv_path = os.path.join(temp_dir, f'{name}.csv')
+    if result.returncode != 0 or not os.path.exists(csv_path): # OpenFace failed, so nothing is moved into the output directory
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return {'status': 'failed', 'elapsed': elapsed, 'returncode': result.returncode, 'error': result.stderr.decode(errors='replace')[-1000:]}
+
+    frames = count_frames(csv_path)
+    for file in os.listdir(temp_dir): # Move the output files (and directories) into the output directory, the csv file last
+        if file != f'{name}.csv':
+            target = os.path.join(out_dir, file)
+            if os.path.isdir(target): # os.replace cannot replace a directory that is not empty, like the aligned faces of a previous run
+                shutil.rmtree(target)
+            os.replace(os.path.join(temp_dir, file), target)
+    os.replace(csv_path, os.path.join(out_dir, f'{name}.csv')) # The csv only appears in the output directory once all the other files are there
+    os.rmdir(temp_dir)
+    return {'status': 'done', 'elapsed': elapsed, 'frames': frames, 'fps': frames / elapsed if elapsed > 0 else None}
+
+
+def extract_videos(executable, video_dir: str, out_dir: str, max_workers: int = None, args: list = OPENFACE_ARGS) -> dict:
+    """Extracts the features of all the videos in video_dir with OpenFace, running max_workers OpenFace processes at the same time (by default one for each core).
+    executable is the path to FeatureExtraction, or a list with a command (like a stub that replaces OpenFace in tests).
+    Videos that are done according to the manifest (and whose csv file still exists) are skipped. Returns the manifest.
+    """
+    executable = [executable] if isinstance(executable, str) else list(executable)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir) # Get the status of the previous runs
+    all_videos = [video for video in sorted(os.listdir(video_dir)) if os.path.isfile(os.path.join(video_dir, video))]
+    import_existing(all_videos, out_dir, manifest) # The videos that were extracted before the manifest existed are done
+
+    videos = [] # The videos that still need to be extracted
+    for video in all_videos:
+        csv_file = os.path.splitext(video)[0] + '.csv'
+        if manifest.get(video, {}).get('status') == 'done' and os.path.exists(os.path.join(out_dir, csv_file)): # Skip the videos that are done
+            continue
+        videos.append(video)
+
+    for video in videos:
+        manifest[video] = {'status': 'running'} # A video that is still running when the run is interrupted will be retried
+    save_manifest(out_dir, manifest)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) # Every thread waits on its own OpenFace process
+    futures = {} # Create a dict to store the video of each future in
+    try:
+        futures = {executor.submit(extract_video, executable, os.path.join(video_dir, video), out_dir, args): video for video in videos}
+        for future in as_completed(futures):
+            video = futures[future]
+            try:
+                manifest[video] = future.result()
+            except Exception as e: # For example when the executable does not exist
+                manifest[video] = {'status': 'failed', 'error': repr(e)}
+            save_manifest(out_dir, manifest) # Store the status after each video, so an interrupted run can be resumed
+            print(f"{video}: {manifest[video]['status']}" + (f" ({manifest[video]['fps']:.1f} frames per second)" if manifest[video].get('fps') else ''))
+    finally:
+        for future in futures: # When the run is interrupted, the videos that did not start yet are not started anymore
+            future.cancel()
+        executor.shutdown(wait=True) # Wait for the OpenFace processes that are still running
+    return manifest # Return the manifest
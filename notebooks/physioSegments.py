@@ -0,0 +1,95 @@
+## Import the necessary packages
+import os
+import pandas as pd
+import numpy as np
+
+## The functions in this script extract the components (segments) of the physiological recordings, as described in `1-ak-physio-dataframe.ipynb`.
+## Each recording is read once, the trigger edges and the sampling frequency are found once, and then all three segment sets are taken from it:
+##     all:      all the active components of the study, stored in `data\interim\physiological_all`
+##     tsst:     the TSST speech and math component with 3 minutes before and after, stored in `data\interim\physiological`
+##     baseline: the baseline component, stored in `data\interim\physiological_baseline`
+## The segments are slices of the recording, so the signals are only copied once, when the DataFrame of a segment is created.
+
+SEGMENT_DIRS = {'all': 'physiological_all', 'tsst': 'physiological', 'baseline': 'physiological_baseline'} # The interim directory of each segment set
+ACTIVE_COMPONENTS = [0, 3, 4, 5, 6] # The active components of the study in the .acq files
+MARGIN = 2000*60*3 # The amount of samples (3 minutes at 2000 Hz) around the TSST component in the .acq files
+
+
+def get_frequency(timestamps: np.ndarray) -> int:
+    """Computes the frequency of the signals using the following formula: freq=1/(t_1 - t_0)."""
+    return round(1/(timestamps[1] - timestamps[0]))
+
+
+def get_triggers(digital_input: np.ndarray) -> tuple:
+    """Finds the starting points (rising edges) and stop points (falling edges) of the components in the digital input signal. Returns these as two arrays."""
+    edges = np.diff(digital_input) # The change of the digital input from one sample to the next
+    return np.flatnonzero(edges > 0), np.flatnonzero(edges < 0)
+
+
+def create_segment(signals: dict, rows, t_offset: float, pp: int) -> pd.DataFrame:
+    """Creates the DataFrame of one segment, given the signals of the recording and the rows of the segment (a slice or a list of slices).
+    t_from_start is computed as the timestamp minus t_offset.
+    """
+    data = {} # Create the dict to store the columns of the segment in
+    for col, values in signals.items():
+        data[col] = values[rows] if isinstance(rows, slice) else np.concatenate([values[part] for part in rows]) # A slice is a view, a list of slices is concatenated in one copy
+    data = pd.DataFrame(data) # Create a DataFrame with the signals
+    data['t_from_start'] = data['timestamp'] - t_offset # Compute the time between each row in the DataFrame and the starting point
+    data['pp'] = pp # Store the PP_id in the DataFrame
+    data.reset_index(inplace=True) # Reset the index before storing the DataFrame in a feather file for later use
+    return data
+
+
+def extract_segments_acq(bio, pp: int) -> dict:
+    """Extracts all three segment sets from a recording read in with bioread. Returns a dict with the DataFrame of each segment set."""
+    ## Get the EDA, ECG, Time index and Digital input signal (which corresponds to the triggers from the psychopy script), once
+    signals = {'timestamp': bio.channels[0].time_index, 'raw_EDA': bio.channels[0].data, 'raw_ECG': bio.channels[1].data, 'digital_input': bio.channels[2].data}
+    signals = {col: np.asarray(values, dtype=float) for col, values in signals.items()} # The signals are stored as floats
+    starts, stops = get_triggers(signals['digital_input']) # Using the Digital input signal, get the start and stop points of the different components in the study
+    freq = get_frequency(signals['timestamp']) # Compute the frequency of the signals
+
+    segments = {}
+    ## All the active components, between each starting point and its stop point (+1 because the digital signal starts with a stop).
+    ## Like before, t_from_start is computed relative to the starting point of the last active component
+    segments['all'] = create_segment(signals, [slice(starts[i], stops[i+1]) for i in ACTIVE_COMPONENTS], starts[ACTIVE_COMPONENTS[-1]]/freq, pp)
+    ## The TSST speech component until the end of the TSST math component, with 3 minutes before and after
+    segments['tsst'] = create_segment(signals, slice(starts[4] - MARGIN, stops[6] + MARGIN), starts[4]/freq, pp)
+    ## The baseline component
+    segments['baseline'] = create_segment(signals, slice(starts[0], stops[1]), starts[0]/freq, pp)
+    return segments # Return the dict
+
+
+def read_txt(physData_dir: str, file: str) -> pd.DataFrame:
+    """Reads in the SCL and ECG text files of an amsdata recording and merges these on their time index. Returns a DataFrame with the timestamps in seconds."""
+    eda_data = pd.read_csv(os.path.join(physData_dir, f'{file}SCL.txt'), sep=' ', skiprows=3, names=['timestamp', 'raw_EDA'])
+    ecg_data = pd.read_csv(os.path.join(physData_dir, f'{file}ECG.txt'), sep=' ', skiprows=3, names=['timestamp', 'raw_ECG'])
+    data = ecg_data.merge(eda_data, on='timestamp', how='outer') # The EDA and ECG signal have a different sampling frequency, so the merged DataFrame contains empty values
+    data['timestamp'] = data['timestamp']/1000 # The timestamps in the txt files are in ms, but the starting points are in seconds
+    return data
+
+
+def extract_segments_txt(data: pd.DataFrame, pp: int, start_stops: list, start_tsst: float, start_baseline: float) -> dict:
+    """Extracts all three segment sets from an amsdata recording (see read_txt), given the starting and stop points of the active components and
+    the starting points of the TSST speech component and the baseline component (in seconds). Returns a dict with the DataFrame of each segment set.
+    """
+    t = data.timestamp.values
+
+    segments = {}
+    ## All the active components: each row after a starting point AND before the next stop point in start_stops
+    active = np.logical_or.reduce([(t > start_stops[i]) & (t < start_stops[i+1]) for i in range(0, 10, 2)])
+    segments['all'] = data.loc[active].assign(pp=pp).reset_index() # Also store the PP_id in the DataFrame
+    ## The TSST components, from 3 minutes prior to the TSST Speech starting point until 20 minutes after this starting point
+    t_from_start = t - start_tsst # Compute the time between each row in the DataFrame and the starting point
+    tsst = (t_from_start > -180) & (t_from_start < 1200)
+    segments['tsst'] = data.loc[tsst].assign(t_from_start=t_from_start[tsst], pp=pp).reset_index()
+    ## The baseline component, from the baseline starting point until 5 minutes after this starting point
+    t_from_start = t - start_baseline
+    baseline = (t_from_start > 0) & (t_from_start < 300)
+    segments['baseline'] = data.loc[baseline].assign(t_from_start=t_from_start[baseline], pp=pp).reset_index()
+    return segments # Return the dict
+
+
+def save_segments(segments: dict, interim_dir: str, pp: int):
+    """Stores the DataFrame of each segment set as a feather file in its interim directory."""
+    for name, data in segments.items():
+        data.to_feather(os.path.join(interim_dir, SEGMENT_DIRS[name], f'{pp}.feather'))
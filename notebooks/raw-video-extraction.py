@@ -1,23 +1,19 @@
 ## Import the required modules
 import os
-import subprocess
-# Store the required directories in variables so we can easily access them
-project_dir = os.getcwd().split('\\')[:-1]
-project_dir = '\\'.join(project_dir) # Makes sure the script can be used across different computers by setting the working directory dynamically
-video_dir = project_dir + "\\tDCS_Video_Stress\\data\\raw\\Video"
-video_files = os.listdir(video_dir) # Get all the videos that are currently available for extraction
-processed_dir = project_dir + '\\tDCS_Video_Stress\\data\\raw\\Video_features'
-processed_files = os.listdir(processed_dir) # Get all the files that have allready been processed by OpenFace
+from openFaceExtraction import extract_videos
+from src.features import paths
+# Store the required directories in variables so we can easily access them, the data dir is set by DATA_DIR in the .env file of the project (see src/features/paths.py)
+video_dir = str(paths.get_dir('raw_video'))
+processed_dir = str(paths.get_dir('video_features'))
 
-processed_ppts = [file[4:7] for file in processed_files if file.endswith('.csv')] # Extract the participants ids from the files
+# The location of the FeatureExtraction executable of OpenFace, which can be replaced (for example by a stub) with the environment variable OPENFACE_FEATURE_EXTRACTION
+openface = os.environ.get('OPENFACE_FEATURE_EXTRACTION', 'D:\\Documenten\\Artificial Intelligence Master\\Semester 3\\Internship Mitch\\OpenFace\\OpenFace_2.2.0_win_x64\\FeatureExtraction.exe')
+max_workers = int(os.environ['OPENFACE_WORKERS']) if 'OPENFACE_WORKERS' in os.environ else None # The amount of videos processed at the same time, by default one for each core
 
 
-for video in video_files: # Run through all video files
-    ppt = video[4:7] # Get the participant id from the title of the video
-    if ppt in processed_ppts: # If the current participant id is in the list of processed participants than skip the current participant 
-        continue
-    else: # Process the current video using the feature extraction module from OpenFace
-        video_loc = video_dir + '\\' + video
-        subprocess.run(['D:\\Documenten\\Artificial Intelligence Master\\Semester 3\\Internship Mitch\\OpenFace\\OpenFace_2.2.0_win_x64\\FeatureExtraction.exe',
-                        '-f', video_loc, '-out_dir', processed_dir, "-2Dfp",   "-3Dfp", "-pdmparams", "-pose", "-aus", "-gaze", "-hogalign"])
-
+if __name__ == '__main__':
+    # Process all the videos that are not done yet, using the feature extraction module from OpenFace. The status of each video is stored in
+    # `extraction_manifest.json` in the processed dir, so when the script is interrupted it can simply be started again to resume
+    manifest = extract_videos(openface, video_dir, processed_dir, max_workers)
+    failed = [video for video, status in manifest.items() if status['status'] != 'done'] # Get the videos that failed
+    print(f'{len(manifest) - len(failed)} videos done, {len(failed)} failed' + (f": {', '.join(failed)}" if failed else ''))
@@ -0,0 +1,309 @@
+## Import the necessary packages
+import os
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.features.targetComputation import compute_EDA_Targets, compute_ECG_Targets, prepare_physio, compute_EDA_Targets_prepared, compute_ECG_Targets_prepared, TARGET_RATES, DECIMATED_GROUPS
+from src.features import features as ft
+from src.features import slidingFeatures as sf
+from windowing import sort_on_time, get_start_end, get_bounds, get_quality_index, get_window_quality
+import windowCache as wc
+import signalStore as ss
+from src.features import profiling as prof
+
+## The functions in this script sample and process the windows of the participants, as described in the notebook `4-ak-window-sampling`.
+## They are stored in a script (instead of the notebook) so they can be run in separate worker processes.
+## Each stage of the sampling (reading, windowing, quality checks, every video and physio window and every group of features/targets) is wrapped in a profiling
+## stage (see profiling.py), which records nothing unless the profiling is switched on (profile=True in sample_windows). The computation of a window is recorded
+## as the stage `process_video_window` or `process_physio_window`, with the stages of its groups (e.g. `video.mean_AUs-prepared`) inside it.
+
+
+## The features (video) and targets (physio) are computed in groups. Each group has a version tag and two functions: one that computes the
+## results from the window itself and one that computes them from the recording of the participant that was prepared once (None if there is no such function).
+## The groups are cached separately (see windowCache.py), so when a function changes only its group needs to be recomputed: bump its version tag.
+## A new group can be added here, which will then be computed for all the cached windows on the next run.
+VIDEO_GROUPS = {
+    'mean_AUs': ('1', ft.compute_mean_AUs, sf.compute_mean_AUs), # Computation of mean FAU and mean change FAU
+    'std_AUs': ('1', ft.compute_std_AUs, sf.compute_std_AUs), # Computation of std FAU
+    'arousal': ('1', ft.compute_arousal, None), # Computation of arousal
+    'emotions': ('1', ft.compute_emotions, sf.compute_emotions), # Computation of various emotions
+    'head_motion': ('1', ft.compute_head_motion, sf.compute_head_motion), # Computation of std of head motion in different directions
+    'PD': ('2', ft.compute_PD_features, sf.compute_PD_features), # Computation of various Pupil Diameter (PD) features
+    'blink_rate': ('1', lambda window: {'blink_rate': ft.compute_blink_rate(window)}, lambda prepared, lower, upper: {'blink_rate': sf.compute_blink_rate(prepared, lower, upper)}), # Computation of the blink rate
+}
+## The quality rules of the video windows: a window is removed when less than MIN_GOOD_FRAMES of its frames have a confidence rating of at least CONFIDENCE_THRESHOLD.
+## The features of the frames below the threshold are set to NaN (see mask_frames), but only in the windows that are kept.
+CONFIDENCE_THRESHOLD = ft.CONFIDENCE_THRESHOLD # The minimal confidence rating of a good frame (shared with the streaming inference, see features.py)
+MIN_GOOD_FRAMES = ft.MIN_GOOD_FRAMES # The minimal proportion of good frames in a window
+## frames_away_start is masked as well: the original list named it 'frames_away_start ' (with a space), so it was always set to NaN, which is kept as it was
+UNMASKED_COLUMNS = ['frame', 'face_id', 'timestamp', 'confidence', 'success', 'started', 'pp', 't_from_start'] # The columns that are not set to NaN in low confidence frames
+PHYSIO_GROUPS = {
+    'EDA': ('1', compute_EDA_Targets, compute_EDA_Targets_prepared), # Computation of the EDA targets
+    'ECG': ('1', compute_ECG_Targets, compute_ECG_Targets_prepared), # Computation of the ECG targets
+}
+
+
+def check_video_windows(video_data: pd.DataFrame, lower: np.ndarray, upper: np.ndarray) -> tuple:
+    """Checks all the video windows [lower, upper) of a participant at once: a window is kept when at least MIN_GOOD_FRAMES of its frames have a confidence rating of at least CONFIDENCE_THRESHOLD,
+    using a prefix count of the good frames (see windowing.get_quality_index).
+    No window is sliced. Returns a boolean array of the windows that are kept, and a dict with the rejection statistics (amount of windows, removed windows and the mean proportion of good frames).
+    """
+    index = get_quality_index(video_data.confidence.values >= CONFIDENCE_THRESHOLD) # The prefix count of the good frames
+    quality = get_window_quality(index, lower, upper) # The proportion of good frames in each window
+    kept = quality >= MIN_GOOD_FRAMES # Empty windows (NaN) are removed as well
+    valid = quality[~np.isnan(quality)] # The quality of the windows that are not empty
+    stats = {'windows': len(kept), 'removed': int(len(kept) - kept.sum()), 'mean_quality': float(valid.mean()) if len(valid) else np.nan}
+    return kept, stats
+
+
+def mask_frames(video_data: pd.DataFrame, rows: np.ndarray = None) -> pd.DataFrame:
+    """Sets the features of the frames with a confidence rating lower than CONFIDENCE_THRESHOLD to NaN, only in the given rows (a boolean array, all rows if None).
+    Returns a copy if there are such frames, otherwise the DataFrame itself.
+    """
+    low = video_data.confidence.values < CONFIDENCE_THRESHOLD # The frames with a low confidence rating
+    if rows is not None:
+        low &= rows
+    if not low.any(): # Nothing needs to be masked, so no copy is made
+        return video_data
+    cols = [col for col in video_data.columns if col not in UNMASKED_COLUMNS] # Get all the cols that need to be set to nan
+    video_data = video_data.copy()
+    video_data.loc[low, cols] = np.nan # Set desired cols to nan
+    return video_data
+
+
+def get_physio_source(physio_data, pp: int) -> tuple:
+    """Gets the times of the physio samples and a function that takes a physio window from its positional bounds. physio_data is either the physio DataFrame,
+    which is sorted on time first, or the signals of the participant in the signal store (see signalStore.open_signals), which are already ordered in time.
+    """
+    if isinstance(physio_data, pd.DataFrame):
+        with prof.stage('sort_on_time', rows=len(physio_data), pp=pp):
+            physio_data = sort_on_time(physio_data) # Make sure the physio DataFrame is ordered in time, so windows are positional slices
+        return physio_data.t_from_start.values, lambda lower, upper: physio_data.iloc[lower:upper]
+    return physio_data['t_from_start'], lambda lower, upper: ss.read_window(physio_data, lower, upper)
+
+
+def get_video_source(video_data: pd.DataFrame, lower: np.ndarray, upper: np.ndarray, kept: list, pp: int):
+    """Gets a function that takes a video window from its positional bounds. The low confidence frames are only masked in the kept windows, once,
+    when the first window is taken (so not at all when every window is cached or removed).
+    """
+    covered = np.cumsum(np.bincount(lower[kept], minlength=len(video_data)+1) - np.bincount(upper[kept], minlength=len(video_data)+1))[:-1] > 0 # The frames inside a kept window
+    masked = {} # Holds the masked video DataFrame once it is created
+
+    def get_video_window(lower: int, upper: int) -> pd.DataFrame:
+        if 'video' not in masked:
+            with prof.stage('mask_frames', rows=len(video_data), pp=pp):
+                masked['video'] = mask_frames(video_data, covered)
+        return masked['video'].iloc[lower:upper]
+    return get_video_window
+
+
+def get_levels(physio_data, points: list, decimated: list) -> dict:
+    """Gets the physio groups in decimated that are computed from their lower rate level in the signal store (see TARGET_RATES), when that level is stored.
+    Returns a dict with for each of these groups: (rate, decimation, bounds of the windows in the level, function that takes a window from the level).
+    """
+    levels = {} # Create the dict to store the levels in
+    if not decimated or isinstance(physio_data, pd.DataFrame): # Only the signal store has lower rate levels
+        return levels
+    for name, (col, rate) in TARGET_RATES.items():
+        decimation = ss.get_decimation(physio_data, col, rate) if name in decimated else None # The groups that are not in decimated are computed at the native rate
+        if decimation is not None: # This level is stored, so get the bounds of the windows in it
+            levels[name] = (rate, decimation, get_bounds(physio_data[f'{col}@{rate}_t'], points),
+                            lambda lower, upper, col=col, rate=rate: ss.read_level_window(physio_data, col, rate, lower, upper))
+    return levels
+
+
+def get_group_method(source: dict, name: str, prepared_function, levels: dict) -> tuple:
+    """Gets how a group of features/targets is computed: from the prepared recording, from the windows themselves or (physio only) from the windows of its lower rate level.
+    Returns the method (part of the cache key), the bounds of the windows, the function that takes a window (None for the prepared recording) and the keyword arguments of the group function.
+    """
+    if source['use_prepared'] and prepared_function is not None:
+        return 'prepared', source['bounds'], None, {}
+    if source['name'] == 'physio' and name in levels: # Compute the group from its lower rate level instead
+        rate, decimation, bounds, get_window = levels[name]
+        return f'window{rate}Hz', bounds, get_window, {'decimation': decimation}
+    return 'window', source['bounds'], source['get_window'], {}
+
+
+def get_prepared(source: dict, pp: int):
+    """Prepares the whole recording of the participant once (see slidingFeatures.prepare_video and targetComputation.prepare_physio), when the first group needs it."""
+    if source['prepared'] is None:
+        prepare, n = source['prepare'], len(source['times'])
+        with prof.stage(f'{prepare.__module__}.{prepare.__name__}', rows=n, pp=pp):
+            source['prepared'] = prepare(source['get_window'](0, n))
+    return source['prepared']
+
+
+def load_group(context: dict, key: tuple, source: str) -> dict:
+    """Reads the cached results of a group of features/targets from the window cache (see windowCache.load_entry). Returns an empty dict without a cache_dir."""
+    if not context['cache_dir']:
+        return {}
+    with prof.stage('cache.load', pp=context['pp']):
+        return wc.load_entry(context['cache_dir'], *key, context['input_hashes'][source])
+
+
+def store_group(context: dict, key: tuple, source: str, results: dict):
+    """Stores the results of a group of features/targets in the window cache (see windowCache.store_entry), when there is a cache_dir."""
+    if context['cache_dir']:
+        with prof.stage('cache.store', pp=context['pp']):
+            wc.store_entry(context['cache_dir'], *key, context['input_hashes'][source], results)
+
+
+def compute_group(source: dict, name: str, group: tuple, context: dict) -> dict:
+    """Computes a group of features/targets (see VIDEO_GROUPS and PHYSIO_GROUPS) for the kept windows of a source, only for the windows that are not in the cache.
+    Returns a dict with the results of each kept window, keyed on its starting and ending point.
+    """
+    pp, points = context['pp'], context['points']
+    version, window_function, prepared_function = group
+    method, (lower, upper), get_window, kwargs = get_group_method(source, name, prepared_function, context['levels'])
+    key = (pp, f"{source['name']}_{name}-{method}", version, context['window_size'], context['step_size']) # The key of the group in the cache, without the input hash
+    results = load_group(context, key, source['name']) # Get the cached results of each window
+    missing = [j for j in context['kept'] if points[j] not in results] # The windows that still need to be computed
+    prepared = get_prepared(source, pp) if missing and get_window is None else None
+    for j in missing: # Compute the group for each missing window
+        with prof.stage(f"process_{source['name']}_window", rows=upper[j] - lower[j], pp=pp): # Recorded for each group of each window, so its total is the time spent on the windows
+            if get_window is None: # Compute the group from the prepared recording
+                with prof.stage(f"{source['name']}.{name}-{method}", rows=upper[j] - lower[j], pp=pp):
+                    results[points[j]] = prepared_function(prepared, lower[j], upper[j])
+            else: # Compute the group from the window itself
+                with prof.stage(f"{source['name']}.get_window", rows=upper[j] - lower[j], pp=pp):
+                    window = get_window(lower[j], upper[j])
+                with prof.stage(f"{source['name']}.{name}-{method}", rows=len(window), pp=pp):
+                    results[points[j]] = window_function(window, **kwargs)
+    if missing:
+        store_group(context, key, source['name'], results) # Store the new results in the cache
+    return results
+
+
+def sample_pp(pp: int, physio_data, video_data: pd.DataFrame, window_size: int, step_size: int, incremental: bool = True, physio_once: bool = False,
+              cache_dir: str = None, input_hashes: dict = None, decimated: list = DECIMATED_GROUPS) -> tuple:
+    """Samples the data of one specific participant. Returns a list of dicts, where each dict represents a processed window, and the amount of removed windows.
+    With physio_once=True the physio recording is processed once for all windows (see targetComputation.prepare_physio), instead of once for every window.
+    With a cache_dir the results of each group of features/targets are read from and stored in the window cache (see windowCache.py), so only the groups
+    and windows that are not cached yet are computed. input_hashes is a dict with the hash of the 'video' and 'physio' file of the participant.
+    physio_data is either the physio DataFrame, or the signals of the participant in the signal store (see signalStore.open_signals), of which only the windows are read.
+    The physio groups in decimated (by default only 'EDA', see DECIMATED_GROUPS) are computed per window from their lower rate in the signal store (see TARGET_RATES),
+    when it is stored there. Set decimated=['EDA', 'ECG'] to also compute the HRV measures at 500 Hz, or decimated=[] to compute every group at the native rate.
+    """
+    with prof.stage('sort_on_time', rows=len(video_data), pp=pp):
+        video_data = sort_on_time(video_data) # Make sure the video DataFrame is ordered in time, so windows are positional slices
+    video_times = video_data.t_from_start.values
+    physio_times, get_physio_window = get_physio_source(physio_data, pp)
+
+    with prof.stage('get_bounds', pp=pp):
+        points = get_start_end(video_data, window_size, step_size) # Get the starting and end points based on the video DataFrame
+        video_bounds, physio_bounds = get_bounds(video_times, points), get_bounds(physio_times, points) # Get the positional bounds of all the video and physio windows at once
+    with prof.stage('check_video_windows', rows=len(video_data), pp=pp):
+        accepted, stats = check_video_windows(video_data, *video_bounds) # Check the quality of all the windows at once, before any window is taken
+    kept = np.flatnonzero(accepted).tolist() # The windows that pass the quality checks
+
+    context = {'pp': pp, 'window_size': window_size, 'step_size': step_size, 'points': points, 'kept': kept, 'cache_dir': cache_dir, 'input_hashes': input_hashes,
+               'levels': get_levels(physio_data, points, decimated)} # What every group of this participant needs
+    sources = [{'name': 'video', 'times': video_times, 'bounds': video_bounds, 'get_window': get_video_source(video_data, *video_bounds, kept, pp), 'groups': VIDEO_GROUPS,
+                'prepare': sf.prepare_video, 'use_prepared': incremental, 'prepared': None},
+               {'name': 'physio', 'times': physio_times, 'bounds': physio_bounds, 'get_window': get_physio_window, 'groups': PHYSIO_GROUPS,
+                'prepare': prepare_physio, 'use_prepared': physio_once, 'prepared': None}]
+    processed_windows = {j: {} for j in kept} # Create a dict to store the processed window of each kept window in
+    for source in sources: # First process the video windows, then the physio windows
+        lower, upper = source['bounds']
+        for j in kept: # Add the first and last timestamp of each window
+            processed_windows[j][f"t_start_{source['name']}"] = source['times'][lower[j]]
+            processed_windows[j][f"t_end_{source['name']}"] = source['times'][upper[j] - 1]
+        for name, group in source['groups'].items(): # For each group of features/targets
+            results = compute_group(source, name, group, context)
+            for j in kept:
+                processed_windows[j] = {**processed_windows[j], **results[points[j]]} # Add the results of this group to the processed window
+
+    for j in kept:
+        processed_windows[j]['start'], processed_windows[j]['end'] = points[j] # Add the starting and ending point to the processed window dict
+        processed_windows[j]['pp'] = pp # Add the pp id to the processed window dict
+        processed_windows[j]['pp_window'] = j + 1 # Add the window id of this specific pp to the processed window dict
+    return list(processed_windows.values()), stats['removed'] # Return the list of processed windows and the amount of removed windows
+
+
+def load_physio(physio_dir: str, pp: int) -> pd.DataFrame:
+    """Reads in the physio DataFrame of a participant."""
+    return pd.read_feather(os.path.join(physio_dir, f'{pp}.feather'))
+
+
+def load_video(video_dir: str, pp: int) -> pd.DataFrame:
+    """Reads in the video DataFrame of a participant. The features of the frames with a confidence rating lower than 80% are set to NaN later, only in the windows that are kept (see mask_frames)."""
+    return pd.read_feather(os.path.join(video_dir, f'{pp}.feather')) # Read in video DataFrame
+
+
+def sample_pp_job(job: tuple) -> tuple:
+    """Samples one (pp, window_size, step_size) job, reading in the DataFrames of the participant itself. Runs in a worker process.
+    Returns the job together with the processed windows, the amount of removed windows and the profiling records of the job (empty unless profile is set, see profiling.py).
+    """
+    pp, window_size, step_size, physio_dir, video_dir, incremental, physio_once, cache_dir, physio_store, decimated, profile, profile_allocations = job # Unpack the job
+    pd.set_option('mode.chained_assignment', None) # Set this options to avoid annoying warnings (Not necessary)
+    switch_on = profile and not prof.settings['enabled'] # The profiling is switched on for this job, and off again afterwards
+    if switch_on:
+        prof.enable(profile_allocations)
+    with prof.stage('sample_pp_job', pp=pp):
+        if physio_store: # Open the physio signals in the signal store, which are only read window by window
+            with prof.stage('open_signals'):
+                physio_data = ss.open_signals(physio_store, pp)
+        else:
+            with prof.stage('load_physio'):
+                physio_data = load_physio(physio_dir, pp)
+        input_hashes = None
+        if cache_dir: # The results in the cache are keyed on the contents of the files of the participant
+            with prof.stage('hash_inputs'):
+                input_hashes = {'physio': ss.signals_hash(physio_data) if physio_store else wc.hash_file(os.path.join(physio_dir, f'{pp}.feather')), 'video': wc.hash_file(os.path.join(video_dir, f'{pp}.feather'))}
+        with prof.stage('load_video'):
+            video_data = load_video(video_dir, pp)
+        processed_windows, removed = sample_pp(pp, physio_data, video_data, window_size, step_size, incremental, physio_once, cache_dir, input_hashes, decimated) # Sample and process all the windows of this participant
+    records = prof.take_records() if profile else [] # The records are sent back to the main process
+    if switch_on:
+        prof.disable()
+    return pp, window_size, step_size, processed_windows, removed, records # Return the results
+
+
+def sample_windows(pps: list, physio_dir: str, video_dir: str, configs: list, max_workers: int = None, incremental: bool = True, physio_once: bool = False,
+                   cache_dir: str = None, max_cache_bytes: int = wc.MAX_CACHE_BYTES, physio_store: str = None, decimated: list = DECIMATED_GROUPS, profile: bool = False,
+                   profile_allocations: bool = False) -> dict:
+    """Samples all the participants for each (window_size, step_size) in configs, spreading the (pp, window_size, step_size) jobs over a pool of worker processes.
+    Returns a dict with for each (window_size, step_size) a DataFrame of the processed windows and the amount of removed windows.
+    The windows are ordered on participant (in the order of pps) and window, so the DataFrame is the same as when the participants are sampled one after another.
+    With max_workers=1 all jobs are run in the current process.
+    With a cache_dir the processed windows are cached on disk (see windowCache.py), so a rerun only computes the windows of new or changed participants and
+    the groups of features/targets that were added or changed. Afterwards the cache is reduced to max_cache_bytes by removing the least recently used entries.
+    With a physio_store the physio signals are read from the signal store (see signalStore.py, created with signalStore.convert_feathers) instead of from physio_dir,
+    so the workers only read the windows they process instead of the whole recording of a participant. The groups of targets in decimated are then computed from
+    the decimated levels of the signal store (see targetComputation.TARGET_RATES): by default only the EDA targets, as the R-peaks of the ECG are not always the
+    same at 500 Hz. Set decimated=['EDA', 'ECG'] to also compute the ECG targets from their level, or decimated=[] to compute all of them at the native rate.
+    With profile=True every stage of every job is profiled (see profiling.py), with profile_allocations=True including the memory it allocates. The records
+    of the workers are collected in profiling.records, from which they can be summarised (profiling.print_summary) or exported (profiling.export_trace).
+    """
+    from tqdm.auto import tqdm # Only the main process shows progress, so the workers do not import it
+    jobs = [(pp, window_size, step_size, physio_dir, video_dir, incremental, physio_once, cache_dir, physio_store, decimated, profile, profile_allocations)
+            for window_size, step_size in configs for pp in pps] # Create a job for each participant, window size and step size
+    results = {} # Create a dict to store the results of each job in
+    if max_workers == 1: # Run the jobs one after another in this process
+        for job in tqdm(jobs, desc='jobs'):
+            pp, window_size, step_size, processed_windows, removed, records = sample_pp_job(job)
+            results[(pp, window_size, step_size)] = (processed_windows, removed)
+            prof.add_records(records)
+    else: # Spread the jobs over the worker processes, the results are collected in the order in which they finish
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(sample_pp_job, job) for job in jobs]
+            for future in tqdm(as_completed(futures), total=len(futures), desc='jobs'):
+                pp, window_size, step_size, processed_windows, removed, records = future.result()
+                results[(pp, window_size, step_size)] = (processed_windows, removed)
+                prof.add_records(records)
+
+    sampled = {} # Create the dict to store a DataFrame for each window size and step size
+    for window_size, step_size in configs: # For each window size and step size
+        df = [] # Create a list in which to store the processed windows
+        removed = 0 # Keep track of how many windows are removed
+        for pp in pps: # Combine the results in the order of the participants, regardless of the order in which the jobs finished
+            df += results[(pp, window_size, step_size)][0] # Add the processed windows of this participant
+            removed += results[(pp, window_size, step_size)][1] # Add the amount of removed windows of this participant
+        df = pd.DataFrame(df) # Create a DataFrame from this list of dicts
+        df.pp = df['pp'].astype('str') # Set pp to type string
+        df['window'] = df.index # Set the index as column `window` to have unique window ids for all the windows
+        sampled[(window_size, step_size)] = (df, removed)
+
+    if cache_dir:
+        wc.evict_cache(cache_dir, max_cache_bytes) # Keep the cache within its maximum size
+    return sampled # Return the dict
@@ -0,0 +1,163 @@
+## Import the necessary packages
+import os
+import json
+import hashlib
+import pandas as pd
+import numpy as np
+from windowing import sort_on_time, get_bounds
+from windowCache import hash_file
+
+## The functions in this script store the physio DataFrames of `data\interim\physiological` (see `1-ak-physio-dataframe.ipynb`) as a signal store,
+## in which every column of a participant is stored in its own .npy file:
+##     store_dir/3/header.json, store_dir/3/t_from_start.npy, store_dir/3/raw_EDA.npy, store_dir/3/raw_ECG.npy, ...
+## The signals (raw_EDA, raw_ECG, digital_input) are stored as float32, the time columns as float64. The files are opened as memory maps, so
+## reading a window only reads the pages of the window from disk instead of the whole recording, and the operating system can drop these pages
+## again when memory is needed. The small header holds the columns, their dtype, the amount of rows and the first and last timestamp.
+## Next to the native signal, lower rate versions of the channels in PYRAMID are stored (a decimation pyramid), for example
+##     store_dir/3/raw_EDA@100.npy, store_dir/3/raw_EDA@100_t.npy, store_dir/3/raw_EDA@25.npy, store_dir/3/raw_EDA@25_t.npy, ...
+## with the timestamps (t_from_start) of each level in the `_t` file. Each level is decimated from the level above it with an anti-aliasing
+## low-pass filter that is run forwards and backwards over the whole recording, so the filter does not shift the signal in time and there are
+## no filter edge effects at the borders of the windows. The targets that do not need the native rate are computed from these levels (see targetComputation.TARGET_RATES).
+
+TIME_COLUMNS = ['timestamp', 't_from_start'] # The columns that keep their full precision
+PYRAMID = {'raw_EDA': [100, 25], 'raw_ECG': [500]} # The rates (in Hz) at which each channel is stored next to its native rate
+MAX_STAGE = 10 # The largest factor by which a signal is decimated in one step, larger factors are split in stages (scipy advises at most 13 for this filter)
+
+
+def get_stages(factor: int) -> list:
+    """Splits a decimation factor into stages of at most MAX_STAGE, largest first. Returns the factors of the stages in a list."""
+    stages = [] # Create a list to store the factor of each stage in
+    for stage in range(MAX_STAGE, 1, -1):
+        while factor % stage == 0:
+            stages.append(stage)
+            factor //= stage
+    if factor > 1: # A prime factor larger than MAX_STAGE
+        stages.append(factor)
+    return stages
+
+
+def decimate(values: np.ndarray, factor: int) -> np.ndarray:
+    """Decimates a signal by an integer factor with an anti-aliasing filter: the order 8 Chebyshev type I low-pass filter of scipy.signal.decimate, applied forwards and backwards.
+    The ith value of the result corresponds to the (i*factor)th value of the signal.
+    """
+    from scipy import signal as sps # Only imported when a signal is decimated, so the workers that only read the store start fast
+    for stage in get_stages(factor):
+        sos = sps.cheby1(8, 0.05, 0.8 / stage, output='sos') # Cut off at 80% of the new Nyquist frequency
+        gain = np.prod(sos[:, :3].sum(axis=1) / sos[:, 3:].sum(axis=1)) # The gain at 0 Hz is below 1 because of the passband ripple, which would lower the level of the EDA signal by ~1% per stage
+        values = sps.sosfiltfilt(sos, values)[::stage] / gain**2 # The filter is applied twice, so its gain is corrected twice
+    return values
+
+
+def write_pyramid(pp_dir: str, physio_data: pd.DataFrame, pyramid: dict) -> dict:
+    """Writes the lower rate versions of the channels in pyramid, from the rows in which the channel has a value. Levels whose rate does not divide the native rate are skipped.
+    Returns a dict with for each channel its native rate and the stored rates, which is stored in the header.
+    """
+    levels = {} # Create the dict to store the native and stored rates of each channel in
+    for col, rates in pyramid.items():
+        if col not in physio_data.columns:
+            continue
+        rows = physio_data[col].notna().values # The EDA and ECG signal can have a different sampling frequency, so only the rows with a value are used
+        t = physio_data.t_from_start.values[rows]
+        if len(t) < 2:
+            continue
+        native = round(1/(t[1] - t[0])) # Calculate the frequency at which the channel was sampled
+        levels[col] = {'native': native, 'rates': []}
+        values, rate = physio_data[col].values[rows].astype('float64'), native # The filter is run in float64
+        for target in sorted(rates, reverse=True): # Each level is decimated from the previous one
+            if target >= rate or rate % target: # Only integer factors are supported
+                continue
+            values, rate = decimate(values, rate // target), target
+            np.save(os.path.join(pp_dir, f'{col}@{rate}.npy'), values.astype('float32'))
+            np.save(os.path.join(pp_dir, f'{col}@{rate}_t.npy'), np.ascontiguousarray(t[::native // rate])) # The timestamps of the kept values
+            levels[col]['rates'].append(rate)
+    return levels # Return the dict
+
+
+def write_signals(store_dir: str, pp: int, physio_data: pd.DataFrame, source_hash: str = None, pyramid: dict = PYRAMID):
+    """Writes the physio DataFrame of a participant to the signal store, ordered on `t_from_start`, together with the lower rate levels in pyramid (see write_pyramid).
+    source_hash is the hash of the feather file it was read from (if any).
+    """
+    physio_data = sort_on_time(physio_data) # The windows are found with a binary search on the time column, so the rows need to be ordered in time
+    pp_dir = os.path.join(store_dir, str(pp))
+    os.makedirs(pp_dir, exist_ok=True)
+
+    columns = {} # The dtype of each stored column
+    for col in physio_data.columns:
+        if col == 'pp': # The pp id is the same for every row, so it is stored in the header
+            continue
+        values = physio_data[col].values
+        if values.dtype.kind == 'f': # Floats are stored as float32, except the time columns
+            values = values.astype('float64' if col in TIME_COLUMNS else 'float32')
+        np.save(os.path.join(pp_dir, f'{col}.npy'), np.ascontiguousarray(values)) # Store each column as one contiguous array
+        columns[col] = values.dtype.str
+    levels = write_pyramid(pp_dir, physio_data, pyramid) # Store the lower rate levels of the channels
+
+    t = physio_data.t_from_start.values
+    header = {'pp': int(pp), 'rows': len(physio_data), 'columns': columns, 'order': list(physio_data.columns), 't_first': float(t[0]), 't_last': float(t[-1]),
+              'levels': levels, 'pyramid': pyramid, 'source_hash': source_hash}
+    with open(os.path.join(pp_dir, 'header.json.tmp'), 'w') as f:
+        json.dump(header, f, indent=1)
+    os.replace(os.path.join(pp_dir, 'header.json.tmp'), os.path.join(pp_dir, 'header.json')) # The header is written last, so a participant without a header is not complete
+
+
+def convert_feathers(physio_dir: str, store_dir: str, pps: list, pyramid: dict = PYRAMID):
+    """Writes the physio feather files of the participants to the signal store, skipping the participants whose feather file and pyramid did not change since they were stored."""
+    for pp in pps:
+        path = os.path.join(physio_dir, f'{pp}.feather')
+        source_hash = hash_file(path) # Get the hash of the feather file
+        header_path = os.path.join(store_dir, str(pp), 'header.json')
+        if os.path.exists(header_path):
+            with open(header_path) as f:
+                header = json.load(f)
+            if header.get('source_hash') == source_hash and header.get('pyramid') == pyramid: # This participant is already stored
+                continue
+        write_signals(store_dir, pp, pd.read_feather(path), source_hash, pyramid)
+
+
+def open_signals(store_dir: str, pp: int) -> dict:
+    """Opens the signals of a participant in the signal store as memory maps, without reading them. Returns a dict with the header and an array for each column."""
+    pp_dir = os.path.join(store_dir, str(pp))
+    with open(os.path.join(pp_dir, 'header.json')) as f:
+        header = json.load(f)
+    signals = {'header': header}
+    for col in header['columns']:
+        signals[col] = np.load(os.path.join(pp_dir, f'{col}.npy'), mmap_mode='r') # Open the array as a memory map
+    for col, level in header.get('levels', {}).items(): # Open the lower rate levels and their timestamps in the same way
+        for rate in level['rates']:
+            signals[f'{col}@{rate}'] = np.load(os.path.join(pp_dir, f'{col}@{rate}.npy'), mmap_mode='r')
+            signals[f'{col}@{rate}_t'] = np.load(os.path.join(pp_dir, f'{col}@{rate}_t.npy'), mmap_mode='r')
+    return signals # Return the dict
+
+
+def signals_hash(signals: dict) -> str:
+    """Returns a hash of the header of a participant in the signal store, which changes when the feather file it was read from or the stored dtypes change."""
+    return hashlib.sha1(json.dumps(signals['header'], sort_keys=True).encode()).hexdigest()
+
+
+def read_window(signals: dict, lower: int, upper: int) -> pd.DataFrame:
+    """Reads the rows [lower, upper) of a participant in the signal store. Returns these as a DataFrame with the same columns as the physio DataFrame."""
+    header = signals['header']
+    window = {col: np.full(upper - lower, header['pp']) if col == 'pp' else np.asarray(signals[col][lower:upper]) for col in header['order']} # Only the pages of the window are read from disk
+    return pd.DataFrame(window, index=pd.RangeIndex(lower, upper)) # The index is the position in the recording
+
+
+def read_range(signals: dict, start: float, end: float) -> dict:
+    """Gets the rows of a participant in the signal store between a starting and ending point (in seconds from the start of the TSST, both included).
+    Returns a dict with a view on each column, no data is copied or read until the values are used.
+    """
+    lower, upper = get_bounds(signals['t_from_start'], [(start, end)]) # Find the rows with a binary search on the time column
+    return {col: signals[col][lower[0]:upper[0]] for col in signals['header']['columns']}
+
+
+def get_decimation(signals: dict, col: str, rate: int) -> int:
+    """Returns the factor by which the level of a channel at the given rate was decimated from its native rate, or None if that level is not stored."""
+    level = signals['header'].get('levels', {}).get(col)
+    if level is None or rate not in level['rates']:
+        return None
+    return level['native'] // rate
+
+
+def read_level_window(signals: dict, col: str, rate: int, lower: int, upper: int) -> pd.DataFrame:
+    """Reads the rows [lower, upper) of the level of a channel at the given rate. Returns these as a DataFrame with the columns `t_from_start`, the channel and `pp`."""
+    t = np.asarray(signals[f'{col}@{rate}_t'][lower:upper])
+    return pd.DataFrame({'t_from_start': t, col: np.asarray(signals[f'{col}@{rate}'][lower:upper]), 'pp': np.full(len(t), signals['header']['pp'])})
@@ -0,0 +1,134 @@
+## Import the necessary packages
+import os
+import pandas as pd
+import numpy as np
+
+## The functions in this script create synthetic recordings of a participant, with the same columns as the video DataFrames of `2-ak-video-dataframe`
+## (OpenFace frames at 25 fps) and the physio DataFrames of `1-ak-physio-dataframe` (EDA and ECG at 2000 Hz), and synthetic baseline statistics files
+## like those of `3-ak-target-variable`. They are used by `benchmark_suite.py`, so the feature and target computation can be timed without the study data.
+## The signals are not meant to be realistic in every detail, only in their shape and size: smooth FAU intensities with blinks, a moving head, two eyes
+## whose pupil and eyelids move, bursts of low confidence frames, a slowly drifting skin conductance with SCRs and an ECG with a varying heart rate.
+
+FPS = 25 # The frame rate of the videos
+PHYSIO_RATE = 2000 # The sampling frequency of the physio recordings
+AUS_R = ['01', '02', '04', '05', '06', '07', '09', '10', '12', '14', '15', '17', '20', '23', '25', '26', '45'] # The FAUs that OpenFace computes an intensity (_r) for
+AUS_C = ['01', '02', '04', '05', '06', '07', '09', '10', '12', '14', '15', '17', '20', '23', '25', '26', '28', '45'] # The FAUs that OpenFace computes a presence (_c) for
+POSE_COLS = ['pose_Tx', 'pose_Ty', 'pose_Tz', 'pose_Rx', 'pose_Ry', 'pose_Rz'] # The head pose columns
+BASELINE_STATS = {'SCL stats': {'PP_meanSCL_Baseline.csv': 'mean_SCL', 'PP_minSCL_Baseline.csv': 'min_SCL', 'PP_meanSCL_all.csv': 'mean_SCL',
+                                'PP_stdSCL_all.csv': 'std_SCL', 'PP_maxSCL_all.csv': 'max_SCL'},
+                  'HRV stats': {'PP_RMSSD_Baseline.csv': 'HRV_RMSSD', 'PP_MeanNN_Baseline.csv': 'HRV_MeanNN', 'PP_SDNN_Baseline.csv': 'HRV_SDNN'}} # The baseline files read by targetComputation.get_baseline
+
+
+def create_random_walk(rng: np.random.Generator, n: int, columns: int, step: float, smooth: int) -> np.ndarray:
+    """Creates a smooth random walk of n rows for each column, by averaging gaussian steps over smooth rows before summing them. Returns a (n x columns) array."""
+    steps = rng.normal(0, step, (n + smooth, columns))
+    steps = (np.cumsum(steps, axis=0)[smooth:] - np.cumsum(steps, axis=0)[:-smooth]) / smooth # A moving average of the steps
+    return np.cumsum(steps, axis=0)
+
+
+def create_eye_landmarks(rng: np.random.Generator, frames: int, openness: np.ndarray) -> dict:
+    """Creates the 56 eye landmarks (`eye_lmk_X_*` and `eye_lmk_Y_*`) of both eyes, with the layout of OpenFace: the iris (0-7), the eyelids (8-19) and
+    the pupil (20-27) of the left eye, followed by those of the right eye (28-55). openness is the proportion (0-1) in which the eyes are open in each frame.
+    Returns a dict with an array for each column.
+    """
+    center = np.array([300., 250.]) + create_random_walk(rng, frames, 2, 0.3, FPS) # The center of the left eye moves with the head
+    pupil = 3 + 0.5*np.sin(np.arange(frames) / (FPS*20)) + create_random_walk(rng, frames, 1, 0.005, FPS)[:, 0].clip(-1, 1) # The radius of the pupil changes slowly
+    iris_angles = np.arange(8) * np.pi/4
+    eyelid_angles = np.pi - np.arange(12) * np.pi/6 # From the left corner over the upper eyelid to the right corner and back over the lower eyelid
+
+    landmarks = {} # Create the dict to store the columns in
+    for eye, offset in [(0, 0), (1, 60)]: # The right eye is 60 pixels to the right of the left eye
+        x, y = center[:, 0] + offset, center[:, 1]
+        points = [(x[:, None] + 6*np.cos(iris_angles), y[:, None] + 6*np.sin(iris_angles)), # The iris
+                  (x[:, None] + 15*np.cos(eyelid_angles), y[:, None] + 6*openness[:, None]*np.sin(eyelid_angles)), # The eyelids
+                  (x[:, None] + pupil[:, None]*np.cos(iris_angles), y[:, None] + pupil[:, None]*np.sin(iris_angles))] # The pupil
+        X, Y = np.hstack([p[0] for p in points]), np.hstack([p[1] for p in points])
+        for i in range(28):
+            landmarks[f'eye_lmk_X_{i + 28*eye}'] = X[:, i]
+            landmarks[f'eye_lmk_Y_{i + 28*eye}'] = Y[:, i]
+    return {col: landmarks[col] for axis in ['X', 'Y'] for col in [f'eye_lmk_{axis}_{i}' for i in range(56)]} # In the order of OpenFace: all X columns, then all Y columns
+
+
+def create_video(seconds: float, pp: int = 1, seed: int = 0, t_start: float = -180, low_confidence: float = 0.02) -> pd.DataFrame:
+    """Creates a synthetic video DataFrame of a participant with the given amount of seconds at 25 fps, starting at t_from_start = t_start.
+    About low_confidence of the frames have a low confidence rating, in bursts of one second. Returns the DataFrame.
+    """
+    rng = np.random.default_rng(seed) # Random number generator, seeded so every run uses the same frames
+    frames = int(seconds*FPS)
+    t = np.arange(frames) / FPS
+
+    ## Blinks: the eyes close for 4 frames about every 4 seconds
+    blink_starts = np.cumsum(rng.exponential(4*FPS, int(seconds/4*2) + 10)).astype(int)
+    closed = np.zeros(frames, dtype=bool)
+    for offset in range(4):
+        closed[blink_starts[blink_starts + offset < frames] + offset] = True
+    openness = np.where(closed, 0.1, 1.0)
+
+    ## Low confidence: bursts of one second, in which OpenFace lost the face
+    confidence = np.clip(rng.normal(0.97, 0.01, frames), 0, 1)
+    n_bursts = int(frames * low_confidence / FPS)
+    for start in rng.integers(0, max(frames - FPS, 1), n_bursts):
+        confidence[start:start + FPS] = rng.uniform(0, 0.6, len(confidence[start:start + FPS]))
+
+    data = {'frame': np.arange(1, frames + 1), 'face_id': np.zeros(frames, dtype=int), 'timestamp': t, 'confidence': confidence, 'success': (confidence > 0.6).astype(int)}
+    data = {**data, **dict(zip(POSE_COLS, (np.array([0, 0, 500, 0, 0, 0]) + create_random_walk(rng, frames, 6, 0.2, FPS) * np.array([1, 1, 1, .002, .002, .002])).T))} # Head pose in mm and rad
+    data = {**data, **create_eye_landmarks(rng, frames, openness)}
+    intensity = 4 - np.abs(create_random_walk(rng, frames, len(AUS_R), 0.02, FPS) % 8 - 4) # FAU intensities between 0 and 4, the walk is reflected at both ends
+    for i, AU in enumerate(AUS_R):
+        data[f'AU{AU}_r'] = np.where(closed, 3.0, intensity[:, i]) if AU == '45' else intensity[:, i] # The intensity of FAU45 (blink) follows the blinks
+    for AU in AUS_C:
+        data[f'AU{AU}_c'] = closed.astype(float) if AU == '45' else (data.get(f'AU{AU}_r', intensity[:, 0]) > 1).astype(float) # A FAU is present above an intensity of 1
+    data['pp'] = pp
+    data['t_from_start'] = t + t_start
+    return pd.DataFrame(data) # Return the DataFrame
+
+
+def create_ecg(rng: np.random.Generator, n: int, rate: int) -> np.ndarray:
+    """Creates an ECG signal of n samples with P, QRS and T waves, and a heart rate that varies around 70 bpm. Returns the signal in mV."""
+    t = np.arange(n) / rate
+    rr = 60/70 + 0.05*np.sin(np.arange(int(n/rate) + 10) * 2*np.pi/15) + rng.normal(0, 0.03, int(n/rate) + 10) # The R-R intervals in seconds
+    beats = np.cumsum(rr)
+    beats = beats[beats < t[-1]]
+    ecg = np.zeros(n)
+    waves = [(-0.2, 0.025, 0.15), (-0.03, 0.008, -0.1), (0, 0.01, 1.2), (0.03, 0.008, -0.25), (0.25, 0.04, 0.3)] # The (offset in seconds, width, height) of the P, Q, R, S and T wave
+    width = int(0.4 * rate)
+    for beat in beats: # Add each beat around its R-peak
+        center = int(beat * rate)
+        rows = np.arange(max(center - width, 0), min(center + width, n))
+        for offset, sd, height in waves:
+            ecg[rows] += height * np.exp(-0.5*((t[rows] - beat - offset) / sd)**2)
+    return ecg + rng.normal(0, 0.02, n) + 0.1*np.sin(t * 2*np.pi * 0.3) # Noise and baseline wander
+
+
+def create_eda(rng: np.random.Generator, n: int, rate: int) -> np.ndarray:
+    """Creates an EDA signal of n samples with a slowly drifting tonic level and SCRs about every 10 seconds. Returns the signal in microsiemens."""
+    t = np.arange(n) / rate
+    tonic = 5 + np.cumsum(rng.normal(0, 0.002, n // rate + 2))[:n // rate + 2] # The tonic level, changing once per second
+    eda = np.interp(t, np.arange(len(tonic)), tonic)
+    response = np.arange(int(10*rate)) / rate
+    response = (np.exp(-response/2) - np.exp(-response/0.75)) # The shape of a SCR, rising in about a second and recovering in a few seconds
+    onsets = np.cumsum(rng.exponential(10, int(t[-1]/10*2) + 10)) # The onsets of the SCRs in seconds
+    for onset, amplitude in zip(onsets[onsets < t[-1]], rng.uniform(0.1, 0.5, len(onsets))):
+        start = int(onset*rate)
+        eda[start:start + len(response)] += amplitude * response[:n - start]
+    return eda + rng.normal(0, 0.001, n)
+
+
+def create_physio(seconds: float, pp: int = 1, seed: int = 0, t_start: float = -180, rate: int = PHYSIO_RATE) -> pd.DataFrame:
+    """Creates a synthetic physio DataFrame of a participant with the given amount of seconds of EDA and ECG at the given rate, starting at t_from_start = t_start. Returns the DataFrame."""
+    rng = np.random.default_rng(seed) # Random number generator, seeded so every run uses the same samples
+    n = int(seconds*rate)
+    timestamp = np.arange(n) / rate + 600 # The recording started 10 minutes before the segment
+    return pd.DataFrame({'timestamp': timestamp, 'raw_EDA': create_eda(rng, n, rate), 'raw_ECG': create_ecg(rng, n, rate), 'digital_input': np.zeros(n),
+                         't_from_start': timestamp - timestamp[0] + t_start, 'pp': pp})
+
+
+def create_baseline_files(data_dir: str, pps: list, seed: int = 0):
+    """Creates the baseline statistics files of the given participants in `data_dir/information`, like `3-ak-target-variable` does, so targetComputation.get_baseline can read them."""
+    rng = np.random.default_rng(seed)
+    values = {'mean_SCL': (5, 0.5), 'min_SCL': (4, 0.3), 'std_SCL': (0.5, 0.05), 'max_SCL': (7, 0.5), 'HRV_RMSSD': (40, 5), 'HRV_MeanNN': (850, 30), 'HRV_SDNN': (50, 5)} # The mean and std of each statistic
+    for subdir, files in BASELINE_STATS.items():
+        os.makedirs(os.path.join(data_dir, 'information', subdir), exist_ok=True)
+        for file, col in files.items():
+            mean, std = values[col]
+            pd.DataFrame({col: rng.normal(mean, std, len(pps))}, index=pd.Index(pps, name='pp')).to_csv(os.path.join(data_dir, 'information', subdir, file))
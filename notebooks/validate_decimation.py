@@ -0,0 +1,97 @@
+## Validates the decimation pyramid of the signal store (see signalStore.py): compares the physio target variables computed per window at the native rate
+## with those computed from every stored lower rate level of the EDA and ECG channel, and times both.
+## Run from the notebooks directory with: python validate_decimation.py
+## The targets of all windows are stored side by side in `data\processed\decimation_validation.csv`, and the summary per target and rate
+## (mean and max absolute difference, mean relative difference, correlation and speedup) in `data\processed\decimation_validation_summary.csv`.
+## Besides the targets, the amount of R-peaks that is detected in each window is compared: a single R-peak more or less changes the HRV measures of
+## a window far more than the mean difference shows, so the summary also holds the amount of windows in which the counts differ.
+import time
+import pandas as pd
+import numpy as np
+from src.features import targetComputation as tc
+from src.features import paths
+import signalStore as ss
+from windowing import get_bounds
+
+WINDOW_SIZE = 60*3 # The window size in seconds
+STEP_SIZE = 60 # The step size in seconds
+TARGETS = {'EDA': ['mean_SCL', 'standardised_mean_scl', 'frequency_NS_SCR'], 'ECG': ['HRV_MeanNN', 'HRV_RMSSD', 'HRV_SDNN', 'n_R_Peaks']} # The targets to compare of each group
+COUNTS = ['n_R_Peaks'] # The targets that are counts, of which the windows that differ are counted
+
+
+def compute_ECG_group(window: pd.DataFrame, decimation: int) -> dict:
+    """Computes the ECG targets of a window, together with the amount of R-peaks that were detected in it. Returns these in a dict."""
+    ecg_signals = tc.detect_R_peaks(window)
+    return {**tc.compute_ECG_Targets(window, decimation=decimation, ecg_signals=ecg_signals), 'n_R_Peaks': int(ecg_signals.ECG_R_Peaks.sum())}
+
+
+FUNCTIONS = {'EDA': tc.compute_EDA_Targets, 'ECG': compute_ECG_group} # The function that computes each group per window
+
+
+def validate_pp(signals: dict) -> tuple:
+    """Computes the targets of all windows of one participant at the native rate and at each stored level. Returns a list of dicts (one per window) and a dict with the time each (group, rate) took."""
+    t = signals['t_from_start']
+    starts = np.arange(t[0], t[-1] - WINDOW_SIZE, STEP_SIZE) # The starting points of the windows of the recording
+    points = list(zip(starts, starts + WINDOW_SIZE))
+    rows = [{'pp': signals['header']['pp'], 'start': start, 'end': end} for start, end in points]
+    times = {} # Create a dict to store the time of each group and rate in
+
+    for group, (col, _) in tc.TARGET_RATES.items():
+        level = signals['header']['levels'].get(col)
+        if level is None: # This channel has no lower rate levels
+            continue
+        for rate in [level['native']] + level['rates']: # First the native rate, then each level
+            if rate == level['native']:
+                lower, upper = get_bounds(t, points)
+                get_window, decimation = lambda l, u: ss.read_window(signals, l, u), 1
+            else:
+                lower, upper = get_bounds(signals[f'{col}@{rate}_t'], points)
+                get_window, decimation = lambda l, u, rate=rate: ss.read_level_window(signals, col, rate, l, u), level['native'] // rate
+            start = time.perf_counter()
+            for row, l, u in zip(rows, lower, upper):
+                targets = FUNCTIONS[group](get_window(l, u), decimation=decimation)
+                for target in TARGETS[group]:
+                    row[f'{target}@{rate}'] = float(targets[target])
+            times[(group, rate)] = time.perf_counter() - start
+    return rows, times
+
+
+def summarise(df: pd.DataFrame, times: dict) -> pd.DataFrame:
+    """Summarises the difference between the targets at each lower rate and at the native rate. Returns a DataFrame with one row per target and rate."""
+    summary = [] # Create a list to store the summary of each target and rate in
+    for (group, rate), elapsed in times.items():
+        native = max(r for g, r in times if g == group) # The native rate is the highest rate of the group
+        if rate == native:
+            continue
+        for target in TARGETS[group]:
+            a, b = df[f'{target}@{native}'], df[f'{target}@{rate}']
+            summary.append({'group': group, 'target': target, 'native_rate': native, 'rate': rate,
+                            'mean_absolute_difference': np.mean(np.abs(a - b)), 'max_absolute_difference': np.max(np.abs(a - b)),
+                            'mean_relative_difference': np.mean(np.abs(a - b) / np.abs(a).replace(0, np.nan)), 'correlation': a.corr(b),
+                            'differing_windows': int((a != b).sum()) if target in COUNTS else np.nan, 'speedup': times[(group, native)] / elapsed})
+    return pd.DataFrame(summary)
+
+
+if __name__ == '__main__':
+    physio_dir, store_dir = paths.get_dir('physio'), paths.get_dir('physio_store')
+    pps = sorted([int(file[:-8]) for file in paths.list_files('physio', '.feather')]) # Get all the participants with a physio DataFrame
+    ss.convert_feathers(physio_dir, store_dir, pps) # Make sure the signal store (and its pyramid) is up to date
+
+    rows, times = [], {}
+    for pp in pps: # For each participant
+        pp_rows, pp_times = validate_pp(ss.open_signals(store_dir, pp))
+        rows += pp_rows
+        for key, elapsed in pp_times.items():
+            times[key] = times.get(key, 0) + elapsed
+        print(f'pp{pp} done: ' + ', '.join(f'{group} at {rate} Hz {elapsed:.1f} s' for (group, rate), elapsed in pp_times.items()))
+
+    df = pd.DataFrame(rows)
+    df.to_csv(paths.get_dir('processed') / 'decimation_validation.csv', index=False) # Store the targets at every rate
+    summary = summarise(df, times)
+    summary.to_csv(paths.get_dir('processed') / 'decimation_validation_summary.csv', index=False) # Store the summary
+
+    print(f'\n{len(df)} windows of {len(pps)} participants\n')
+    for _, row in summary.iterrows():
+        print(f"{row.target:>22} at {row.rate:>4} Hz: mean absolute difference {row.mean_absolute_difference:.4g} ({row.mean_relative_difference:.2%}), "
+              f"max {row.max_absolute_difference:.4g}, correlation {row.correlation:.4f}, speedup {row.speedup:.1f}x"
+              + (f', {row.differing_windows:.0f} of {len(df)} windows differ' if row.target in COUNTS else ''))
@@ -0,0 +1,82 @@
+## Import the necessary packages
+import os
+import hashlib
+import pandas as pd
+
+## The functions in this script implement an on-disk cache for the processed windows of `4-ak-window-sampling.ipynb` (see sampling.sample_pp).
+## The results of every group of features/targets are stored in a Feather file per participant, for example
+##     cache_dir/pp=3/video_mean_AUs-prepared@1@180-180@<hash of the video feather file>.feather
+## with one row per window (the `start` and `end` columns) and one column per feature. The name of the group (including whether it was computed from
+## the window itself or from the prepared recording), its version tag, the window and step size and the hash of the input file together form the
+## key of an entry. When a feather file of a participant or the version of a group changes, the key changes as well, so those results are
+## recomputed and the old entry is removed. Entries that are no longer used are
+## evicted by evict_cache, starting with the entry that was used the longest ago.
+
+MAX_CACHE_BYTES = 2 * 1024**3 # The default maximum size of the cache (2 GB)
+
+
+def hash_file(path: str, chunk_size: int = 2**20) -> str:
+    """Computes the SHA-1 hash of the contents of a file, reading it in chunks. Returns the hash as a hex string."""
+    sha = hashlib.sha1() # Create the hash object
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''): # Read the file chunk by chunk, so large files do not need to fit in memory
+            sha.update(chunk)
+    return sha.hexdigest() # Return the hash
+
+
+def entry_path(cache_dir: str, pp: int, group: str, tag: str, window_size: int, step_size: int, input_hash: str) -> str:
+    """Returns the path of the cache entry of a group of features/targets of a participant."""
+    return os.path.join(cache_dir, f'pp={pp}', f'{group}@{tag}@{window_size}-{step_size}@{input_hash[:16]}.feather')
+
+
+def load_entry(cache_dir: str, pp: int, group: str, tag: str, window_size: int, step_size: int, input_hash: str) -> dict:
+    """Reads in a cache entry. Returns a dict with for each cached window (start, end) a dict of its results, which is empty if there is no entry."""
+    path = entry_path(cache_dir, pp, group, tag, window_size, step_size, input_hash)
+    try:
+        df = pd.read_feather(path) # Read in the entry
+    except (FileNotFoundError, OSError): # There is no (readable) entry, so nothing is cached yet
+        return {}
+    os.utime(path) # Mark the entry as recently used, so it is evicted last
+    return df.set_index(['start', 'end']).to_dict('index') # Return the results of each window
+
+
+def store_entry(cache_dir: str, pp: int, group: str, tag: str, window_size: int, step_size: int, input_hash: str, results: dict):
+    """Writes a cache entry, given a dict with for each window (start, end) a dict of its results. Removes the older entries of the group, which are invalidated by this one."""
+    path = entry_path(cache_dir, pp, group, tag, window_size, step_size, input_hash)
+    os.makedirs(os.path.dirname(path), exist_ok=True) # Create the directory of the participant if needed
+
+    df = pd.DataFrame([{'start': start, 'end': end, **values} for (start, end), values in results.items()]) # One row for each window
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    df.to_feather(temp_path) # Write to a temporary file first, so an interrupted run never leaves a half written entry
+    os.replace(temp_path, path) # Then move it in place in one step
+
+    ## Remove the entries of this group (and window and step size) with another version or input hash
+    for file in os.listdir(os.path.dirname(path)):
+        name = file.split('@')
+        if file.endswith('.feather') and len(name) == 4 and name[0] == group and name[2] == f'{window_size}-{step_size}' and file != os.path.basename(path):
+            try:
+                os.remove(os.path.join(os.path.dirname(path), file))
+            except FileNotFoundError: # Already removed by another process
+                pass
+
+
+def evict_cache(cache_dir: str, max_bytes: int = MAX_CACHE_BYTES) -> int:
+    """Removes the least recently used entries from the cache until it is no larger than max_bytes. Returns the amount of removed entries."""
+    if not os.path.isdir(cache_dir): # There is no cache yet
+        return 0
+    entries = [] # Create a list to store the (last used, size, path) of every entry
+    for pp_dir in os.listdir(cache_dir):
+        for file in os.listdir(os.path.join(cache_dir, pp_dir)):
+            if file.endswith('.feather'):
+                stat = os.stat(os.path.join(cache_dir, pp_dir, file))
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(cache_dir, pp_dir, file)))
+
+    size = sum(entry[1] for entry in entries) # The current size of the cache
+    removed = 0 # Keep track of how many entries are removed
+    for _, entry_size, path in sorted(entries): # Start with the entry that was used the longest ago
+        if size <= max_bytes: # Stop as soon as the cache is small enough
+            break
+        os.remove(path)
+        size -= entry_size
+        removed += 1
+    return removed # Return the amount of removed entries
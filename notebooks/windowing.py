@@ -0,0 +1,59 @@
+## Import the necessary packages
+import pandas as pd
+import numpy as np
+
+
+def sort_on_time(data: pd.DataFrame) -> pd.DataFrame:
+    """Makes sure the rows of a physio or video DataFrame are ordered on the `t_from_start` column, so windows can be taken as positional slices. Returns the (sorted) DataFrame."""
+    if data.t_from_start.is_monotonic_increasing: # The DataFrames created in the notebooks 1 and 2 are already ordered in time, so nothing needs to happen
+        return data
+    return data.sort_values('t_from_start', kind='mergesort') # Otherwise sort the DataFrame once, using a stable sort so rows with the same timestamp keep their order (NaN timestamps end up last)
+
+
+def get_start_end(data: pd.DataFrame, window_size: int, step_size: int) -> list:
+    """Get start & end points of a video signal DataFrame on a given window size and step size.
+    Returns a list of tuples (startpoint, endpoint)
+    """
+    first = data.t_from_start.values[0] # Get the first frame, which acts as the starting point of the first frame
+    last = data.t_from_start.values[-1] # Get the last frame, no window may end beyond this frame
+    end = first + window_size # Compute the first end point, by adding the desired window size to the starting point
+
+    n_steps = int(max(np.ceil((last - end) / step_size), 0)) + 1 if np.isfinite(last - end) else 0 # Upper bound on the amount of steps that fit between the first end point and the last frame
+    ## The points are accumulated with a cumulative sum, which adds the step size one at a time, exactly like a loop would
+    starts = np.cumsum(np.concatenate(([first], np.full(n_steps, step_size, dtype=float)))) # All candidate starting points
+    ends = np.cumsum(np.concatenate(([end], np.full(n_steps, step_size, dtype=float)))) # All candidate end points
+    n_windows = 1 + np.count_nonzero(ends[1:] < last) # Keep the first window and every next window whose end point does not reach beyond the last frame
+
+    return list(zip(starts[:n_windows], ends[:n_windows])) # Return the list of points
+
+
+def get_window_bounds(data: pd.DataFrame, points: list) -> tuple:
+    """Finds the positional bounds of all windows in a DataFrame that is ordered on `t_from_start`, using a binary search per start and end point.
+    Returns two arrays (lower, upper), so that data.iloc[lower[i]:upper[i]] is the window of the ith point.
+    """
+    return get_bounds(data.t_from_start.values, points) # Search in the (sorted) time column
+
+
+def get_bounds(t: np.ndarray, points: list) -> tuple:
+    """Finds the positional bounds of all windows in a sorted array of timestamps, like get_window_bounds. Returns two arrays (lower, upper)."""
+    starts, ends = np.asarray(points, dtype=float).reshape(-1, 2).T # Split the list of tuples into an array of starting points and an array of end points
+    lower = np.searchsorted(t, starts, side='left') # The position of the first row after (or equal to) the starting point
+    upper = np.searchsorted(t, ends, side='right') # The position after the last row before (or equal to) the ending point
+    return lower, upper # Return the bounds
+
+
+def get_window(data: pd.DataFrame, start: int, end: int) -> pd.DataFrame:
+    """Return subset of a DataFrame (window) between a certain start and endpoint. The DataFrame needs to be ordered on `t_from_start` (see sort_on_time)."""
+    lower, upper = get_window_bounds(data, [(start, end)]) # Get the bounds of this single window
+    return data.iloc[lower[0]:upper[0]] # Get all the rows after (or equal to) the starting point AND before (or equal to) the ending point, as a positional slice
+
+
+def get_quality_index(good: np.ndarray) -> np.ndarray:
+    """Computes the prefix count of the good frames (a boolean array) of a participant, so the amount of good frames in any window can be found by subtracting two values."""
+    return np.concatenate(([0], np.cumsum(good))) # The prefix count starts with a zero, so the count of the rows [lower, upper) is index[upper] - index[lower]
+
+
+def get_window_quality(index: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """Computes the proportion of good frames in all the windows [lower, upper) at once from the quality index (see get_quality_index). Empty windows get NaN."""
+    n = upper - lower # The amount of frames in each window
+    return np.divide(index[upper] - index[lower], n, out=np.full(len(n), np.nan), where=n > 0)
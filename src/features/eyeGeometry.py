@@ -0,0 +1,38 @@
+## Import the necessary packages
+import pandas as pd
+import numpy as np
+
+## The functions in this script compute the geometry of the eyes (the pupil diameter) of every frame from the 2D eye landmarks of OpenFace.
+## The 56 eye landmarks (`eye_lmk_X_*` and `eye_lmk_Y_*`) are gathered once into a (frames x landmarks x 2) float32 array, after which all the
+## distances between landmarks are computed in one batched operation. The input DataFrame is never changed.
+## Each eye has 28 landmarks (0-27 for the left eye, 28-55 for the right eye): 8 on the iris (0-7), 12 on the eyelids (8-19) and 8 on the pupil (20-27).
+
+EYE_LANDMARKS = 56 # The amount of eye landmarks of OpenFace
+EYE_OFFSET = 28 # The first landmark of the right eye
+PUPIL_PAIRS = [(27, 23), (26, 22), (25, 21), (24, 20)] # The pairs of opposite points on the pupil of the left eye, the pupil diameter is the average of their distances
+LANDMARK_COLUMNS = [f'eye_lmk_{axis}_{i}' for i in range(EYE_LANDMARKS) for axis in ['X', 'Y']] # The X and Y column of each landmark, next to each other
+
+
+def get_eye_landmarks(video_data: pd.DataFrame) -> np.ndarray:
+    """Gathers the eye landmarks of every frame of a video DataFrame. Returns a (frames x 56 x 2) float32 array with the X and Y coordinate of each landmark."""
+    return video_data[LANDMARK_COLUMNS].to_numpy(dtype='float32').reshape(len(video_data), EYE_LANDMARKS, 2) # One copy of the columns, in the layout of the array
+
+
+def compute_distances(landmarks: np.ndarray, pairs: list) -> np.ndarray:
+    """Computes the distance between the two landmarks of each pair in every frame. Returns a (frames x pairs) float64 array."""
+    first, second = np.asarray(pairs).T # The indices of the first and second landmark of each pair
+    differences = (landmarks[:, first] - landmarks[:, second]).astype(float) # The difference of two nearby float32 coordinates is exact, the rest is computed in float64
+    return np.sqrt((differences**2).sum(axis=-1)) # All the distances at once
+
+
+def compute_eye_geometry(landmarks: np.ndarray) -> dict:
+    """Computes the pupil diameter (PD) of both eyes in every frame from the array of eye landmarks (see get_eye_landmarks), as the average distance between the opposite points on the pupil.
+    Returns a dict with an array for each eye and their average ('PD_left', 'PD_right' and 'PD').
+    """
+    pupil = PUPIL_PAIRS + [(a + EYE_OFFSET, b + EYE_OFFSET) for a, b in PUPIL_PAIRS] # The pairs of landmarks of both eyes, so the distances of both eyes are computed in one operation
+    PD = compute_distances(landmarks, pupil).reshape(-1, 2, len(PUPIL_PAIRS)).mean(axis=2) # The PD of the left and right eye
+
+    geometry = {} # Create the dict to store the arrays in
+    geometry['PD_left'], geometry['PD_right'] = PD[:, 0], PD[:, 1]
+    geometry['PD'] = (PD[:, 0] + PD[:, 1]) / 2 # The PD as the average of the PD of both eyes
+    return geometry # Return the dict
@@ -0,0 +1,135 @@
+## Import the necessary packages
+import pandas as pd
+import numpy as np
+from . import eyeGeometry as eg
+
+## The constants and per frame computations below are shared by the per window functions in this script, the incremental functions in slidingFeatures.py,
+## the window sampling (sampling.py) and the streaming inference (src/models/predict_model.py), so the features are computed the same way everywhere.
+FPS = 25 # The frame rate of the videos
+BASELINE_FRAMES = 60*FPS # The amount of frames in the rolling baseline of the FAU intensities (60 seconds)
+CONFIDENCE_THRESHOLD = 0.8 # The minimal confidence rating of a good frame, the features of the other frames are set to NaN
+MIN_GOOD_FRAMES = 0.95 # The minimal proportion of good frames in a window, the other windows are removed
+AUS = ['01', '02', '04', '05', '06', '07', '09', '10', '12', '14', '15', '17', '20', '23', '25', '26', '45'] # The FAUs of which OpenFace computes an intensity (_r), in the order of its csv files
+EMOTIONS = {'Happy': ['06', '12'], 'Sad': ['01', '04', '15'], 'Angry': ['04', '05', '07', '23'], 'Scared': ['01', '02', '04', '05', '07', '20', '26']} # The FAUs of each emotion, based on iMotions
+
+
+def compute_head_motion(video_data: pd.DataFrame) -> dict:
+    """Computes various measures for head motion and retuns these in a dictionary."""
+    processed = {} # Create the dict to store the results
+    cols = [col for col in video_data.columns if col.startswith('pose')] # Get the columns relevant for head pose
+    for col in cols: # For each of the relevant columns
+        processed[f'std_{col}'] = video_data[col].std() # Computes standard deviation for each of the 6 pose cols
+    cols = [col for col in video_data.columns if col.startswith('pose_T')] # Get the 3 translation pose collumns
+    processed['compound_Motion'] = video_data[cols].std().mean() # Compute the mean of the std of all 3 cols 
+    return processed # Return the results in a dict
+
+
+def compute_frame_emotions(AU) -> dict:
+    """Computes the emotions of every frame as the average intensity of their FAUs (see EMOTIONS). AU holds the intensity of each FAU column ('AU06_r', ...),
+    for example a video DataFrame or a dict of arrays. Returns a dict with the intensities of each emotion.
+    """
+    return {emotion: sum(AU[f'AU{AU_name}_r'] for AU_name in AU_names)/len(AU_names) for emotion, AU_names in EMOTIONS.items()}
+
+
+def compute_emotions(video_data: pd.DataFrame) -> dict:
+    """Computes emotions based on Imotions and returns these in a dict."""
+    ## Compute the average emotion, using the relevant FAUs and store these in the dict
+    return {f'mean_{emotion}': intensity.mean() for emotion, intensity in compute_frame_emotions(video_data).items()} # Return the results in a dict
+
+
+def compute_rolling_mean(values: np.ndarray, frames: int) -> np.ndarray:
+    """Computes the rolling mean over the previous frames (including the current one) of each column in a (frames x columns) array, skipping NaN values.
+    Equal to DataFrame.rolling(frames, min_periods=1).mean(), but computed with cumulative sums. Returns an array of the same shape."""
+    valid = ~np.isnan(values) # The values that are not NaN
+    zeros = np.zeros((1, values.shape[1])) # Start the cumulative sums with zeros, so the sum of the previous frames is the difference of two rows
+    total = np.vstack((zeros, np.cumsum(np.where(valid, values, 0), axis=0))) # Cumulative sum of the values, with NaN counted as zero
+    count = np.vstack((zeros, np.cumsum(valid, axis=0))) # Cumulative count of the non-NaN values
+    first = np.maximum(np.arange(1, len(values) + 1) - frames, 0) # The first frame of the rolling window of each frame
+    total = total[1:] - total[first] # The sum of the rolling window of each frame
+    count = count[1:] - count[first] # The amount of non-NaN values in the rolling window of each frame
+    with np.errstate(invalid='ignore', divide='ignore'): # Windows without any values result in NaN, like in pandas
+        return total / count
+
+
+def compute_frame_arousal(changes: np.ndarray) -> np.ndarray:
+    """Computes the arousal of every frame from a (frames x FAUs) array of the FAU intensities minus their baseline, as the mean of the 5 FAUs with the most
+    intensity (negative intensities count as zero). Returns an array with the arousal of each frame, NaN for the frames without any FAU.
+    """
+    changes = np.where(changes < 0, 0, changes) # Set all negative intensities to zero
+    ## NaN values (frames with a low confidence) are never selected, so a frame with less than 5 FAUs is averaged over the FAUs it does have, like pd.Series.nlargest does
+    n = min(5, changes.shape[1]) # The amount of FAUs to average over
+    changes = np.where(np.isnan(changes), -np.inf, changes) # Set the NaN values to -inf, so they are sorted below every intensity
+    largest = np.partition(changes, changes.shape[1] - n, axis=1)[:, changes.shape[1] - n:] # Get the n largest intensities of each frame, without sorting the entire frame
+    valid = np.isfinite(largest) # The selected intensities that are not NaN
+    count = valid.sum(axis=1) # The amount of FAUs in the top n of each frame that are not NaN
+    with np.errstate(invalid='ignore', divide='ignore'): # A frame without any FAUs gets NaN
+        return np.where(valid, largest, 0).sum(axis=1) / count
+
+
+def compute_arousal(video_data: pd.DataFrame) -> dict:
+    """Computes the arousal based on the mean intensity (_r) of all FAUs (except 45) and returns this in a dict. Based on the Noldus whitepaper."""
+    processed = {} # Create the dict to store the results
+    
+    AU_cols = [col for col in video_data.columns if col.startswith('AU') and col.endswith('_r') and '45' not in col] # Get all the columns that reflect intensity (_r) FAUs except FAU45
+    values = video_data[AU_cols].values.astype(float) # Get the FAU intensities as a (frames x FAUs) array
+    values = values - compute_rolling_mean(values, BASELINE_FRAMES) # Normalise the FAU intensity based on the previous 60 seconds mean intensity
+    
+    frame_arousal = compute_frame_arousal(values) # Compute the mean of the 5 FAUs with the most intensity in each frame
+    frame_arousal = frame_arousal[~np.isnan(frame_arousal)] # A frame without any FAUs is left out
+    processed['mean_Arousal'] = frame_arousal.mean() if len(frame_arousal) else np.nan # Compute the arousal as the mean on the 5 FAUs with the most intensity
+    return processed # Return the results in a dict
+
+
+def compute_mean_AUs(video_data: pd.DataFrame) -> dict:
+    """Computes the mean intensity and mean change in intensity for all FAUs and returns this in a dict."""
+    processed = {} # Create the dict to store the results
+    AU_cols = [col for col in video_data.columns if col.startswith('AU') & col.endswith('_r')] # Get FAU intensity columns 
+    for AU in AU_cols: # For each FAU intensity col
+        processed[f'mean_{AU[:-2]}'] = video_data[AU].mean() # Compute the mean intensity
+        processed[f'mean_change_{AU[:-2]}'] = (video_data[AU] - video_data[AU].rolling(BASELINE_FRAMES, min_periods=1).mean()).mean() # Compute the mean change, reflected as the mean of the corrected intensity
+    return processed # Return the results in a dict
+
+
+def compute_std_AUs(video_data: pd.DataFrame) -> dict:
+    """Computes the standard deviation of intensity for all FAUs and returns this in a dict."""
+    processed = {} # Create the dict to store the results
+    AU_cols = [col for col in video_data.columns if col.startswith('AU') & col.endswith('_r')] # Get FAU intensity columns 
+    for AU in AU_cols: # For each FAU intensity col
+        processed[f'std_{AU[:-2]}'] = video_data[AU].std() # Compute the standard deviation of the intensity
+    return processed # Return the results in a dict
+
+
+def compute_blink_rate(video_data: pd.DataFrame) -> float:
+    """Compute the amount of blinks per minute (blink_rate) for a given video signal and returns the result as a float."""
+    blinks = sum(video_data['AU45_c'].diff() == 1) # Get the number of blinks using the AU45_c column
+    seconds = video_data['t_from_start'].values[-1] - video_data['t_from_start'].values[0] # Get the amount of seconds in the given video signal
+    blinks_sec = blinks/seconds # Compute the amount of blinks per seconds
+    blinks_min = blinks_sec*60 # Compute the amount of blinks per minute
+    return blinks_min # Return the blink rate
+
+
+def compute_percentage_EC(video_data: pd.DataFrame) -> float:
+    """Computes the amount of percentage of frames where the eyes are closed and returns the result as a float"""
+    per_EC = video_data['AU45_c'].sum()/len(video_data['AU45_c']) # Compute how many of the frames, the eyes were classified as closed
+    return per_EC # Return this result
+
+
+def compute_avg_PD_2_eyes(video_data: pd.DataFrame) -> pd.DataFrame:
+    """For both eyes, compute the pupil diameter, as the average of 4 lines across the pupil (see eyeGeometry.py).
+    Returns a copy of the DataFrame with the columns `avg_PD_left`, `avg_PD_right` and `PD` (the average of the PD of both eyes) added, the input is not changed.
+    """
+    geometry = eg.compute_eye_geometry(eg.get_eye_landmarks(video_data)) # Compute the PD of each frame for both eyes at once
+    return video_data.assign(avg_PD_left=geometry['PD_left'], avg_PD_right=geometry['PD_right'], PD=geometry['PD']) # Return a new DataFrame with the PD columns
+
+
+def compute_PD_features(video_data: pd.DataFrame) -> dict:
+    """Computes various features concerning the pupil diameter (PD). Returns these results in a dict."""
+    processed = {} # Create the dict to store the results
+    PD = pd.Series(eg.compute_eye_geometry(eg.get_eye_landmarks(video_data))['PD']) # Compute the average pupil diameter for both eyes for each frame
+    
+    processed['mean_PD'] = PD.mean() # Compute the average PD throughout the signal
+    processed['std_PD'] = PD.std(ddof=0) # Compute the standard deviation of the PD throughout the signal
+    processed['max_PD'] = PD.max() # Compute the max PD throughout the signal
+    
+    return processed # Return the results in a dict
+
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""The locations of the project and its data, as pathlib Paths so they work on Windows and on other systems.
+The data directory is resolved on first use instead of at import, so importing the feature and target modules never touches the disk (or the network share).
+It is the DATA_DIR environment variable, which can be set in the .env file of the project (e.g. to the network share of the lab), or the data directory of the project.
+The files in a directory are only listed when they are asked for, and the listing is kept for the rest of the process.
+"""
+import os
+from functools import lru_cache
+from pathlib import Path
+
+DATA_DIRS = {'raw': ('raw',), 'raw_physio': ('raw', 'Physiological'), 'raw_video': ('raw', 'Video'), 'video_features': ('raw', 'Video_features'),
+             'information': ('information',), 'physio': ('interim', 'physiological'), 'physio_baseline': ('interim', 'physiological_baseline'),
+             'physio_all': ('interim', 'physiological_all'), 'physio_store': ('interim', 'physiological_store'), 'video': ('interim', 'video'),
+             'window_cache': ('interim', 'window_cache'), 'processed': ('processed',), 'feature_store': ('processed', 'feature_store')} # The subdirectories of the data directory
+
+settings = {'data_dir': None} # The data directory, once it is resolved
+
+
+def get_project_dir() -> Path:
+    """Returns the root directory of the project."""
+    return Path(__file__).resolve().parents[2]
+
+
+def load_env():
+    """Loads the .env file of the project into the environment, when python-dotenv is installed. Variables that are already set are kept."""
+    try:
+        from dotenv import load_dotenv
+    except ImportError: # Without python-dotenv only the environment itself is used
+        return
+    load_dotenv(get_project_dir() / '.env')
+
+
+def get_data_dir() -> Path:
+    """Returns the data directory, which is resolved on the first call."""
+    if settings['data_dir'] is None:
+        load_env()
+        data_dir = os.environ.get('DATA_DIR')
+        settings['data_dir'] = Path(data_dir) if data_dir else get_project_dir() / 'data' # The data directory of the project when DATA_DIR is not set
+    return settings['data_dir']
+
+
+def set_data_dir(data_dir):
+    """Uses another data directory for the rest of the process (e.g. the synthetic data of benchmark_suite.py), and forgets the listed files."""
+    settings['data_dir'] = Path(data_dir)
+    list_files.cache_clear()
+
+
+def get_dir(name: str) -> Path:
+    """Returns a subdirectory of the data directory (see DATA_DIRS)."""
+    return get_data_dir().joinpath(*DATA_DIRS[name])
+
+
+@lru_cache(maxsize=None)
+def list_files(name: str, suffix: str = '') -> list:
+    """Lists the files ending with suffix in a subdirectory of the data directory, sorted. Returns an empty list when it does not exist."""
+    directory = get_dir(name)
+    if not directory.is_dir():
+        return []
+    return sorted(file for file in os.listdir(directory) if file.endswith(suffix))
@@ -0,0 +1,133 @@
+## Import the necessary packages
+import os
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import nullcontext, contextmanager
+import pandas as pd
+import numpy as np
+
+## The functions in this script record how long each stage of the window sampling takes (see sampling.py and targetComputation.py), so a slow rerun of
+## `4-ak-window-sampling` can be traced to its cause. A stage is timed with `with stage(name, rows=...)`, which stores a record with the wall time, the amount
+## of rows processed, the participant (inherited from the enclosing stage) and, with allocations=True, the memory allocated during the call (with tracemalloc).
+## The profiling is off by default: stage then returns one shared empty context, so the hooks cost less than a microsecond per call.
+## The records can be summarised per stage (and participant) in a table (see summarise) and exported to a Chrome trace (see export_trace), which can be
+## opened in chrome://tracing or https://ui.perfetto.dev to see every call of every stage on a timeline per worker process.
+
+settings = {'enabled': False, 'allocations': False} # Whether the stages are recorded, and whether their allocations are traced as well
+records = [] # The records of the stages, a dict for each call
+local = threading.local() # The stack of the stages that are running in each thread
+NO_STAGE = nullcontext() # The context that is returned when the profiling is off
+PEAK_RESET = hasattr(tracemalloc, 'reset_peak') # The peak memory of a stage can only be traced from Python 3.9 on, before that only the allocated memory is recorded
+
+
+def enable(allocations: bool = False):
+    """Switches the profiling on. With allocations=True the memory allocated by each stage is traced as well, which makes the code a few times slower."""
+    settings['enabled'], settings['allocations'] = True, allocations
+    if allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """Switches the profiling off. The records are kept until take_records is called."""
+    settings['enabled'] = False
+    if settings['allocations'] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    settings['allocations'] = False
+
+
+def stage(name: str, rows: int = None, pp: int = None):
+    """Returns the context that records a call of the stage name, in which rows rows are processed. The participant pp is taken from the enclosing stage if not given."""
+    if not settings['enabled']: # The fast path: nothing is recorded
+        return NO_STAGE
+    return record_stage(name, rows, pp)
+
+
+@contextmanager
+def record_stage(name: str, rows: int, pp: int):
+    """Records one call of a stage (see stage) when its context is left. Only used when the profiling is on."""
+    stack = local.__dict__.setdefault('stack', []) # The stages that are running in this thread, each as a dict
+    current = {'pp': pp if pp is not None or not stack else stack[-1]['pp'], 'peak': 0} # Inherit the participant of the enclosing stage
+    allocations = settings['allocations'] and tracemalloc.is_tracing()
+    if allocations:
+        memory, peak = tracemalloc.get_traced_memory()
+        if stack: # The enclosing stage keeps the peak it has seen so far, since the peak is reset for this stage
+            stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+        if PEAK_RESET:
+            tracemalloc.reset_peak()
+        current['peak'] = memory
+    stack.append(current)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        stack.pop()
+        record = {'stage': name, 'pp': current['pp'], 'rows': rows, 'start': start, 'duration': end - start, 'depth': len(stack), 'pid': os.getpid(), 'tid': threading.get_ident()}
+        if allocations:
+            after, peak = tracemalloc.get_traced_memory()
+            record['allocated'] = after - memory # The memory that was allocated and not freed during the stage
+            if PEAK_RESET:
+                current['peak'] = max(current['peak'], peak)
+                record['peak'] = current['peak'] - memory # The highest amount of memory in use during the stage, on top of the memory in use at its start
+                if stack:
+                    stack[-1]['peak'] = max(stack[-1]['peak'], current['peak'])
+        records.append(record)
+
+
+def take_records() -> list:
+    """Returns the records and removes them, so the records of a worker process can be sent back to the main process (see add_records)."""
+    taken = records[:]
+    records.clear()
+    return taken
+
+
+def add_records(new_records: list):
+    """Adds the records of a worker process."""
+    records.extend(new_records)
+
+
+def summarise(by: list = None, stage_records: list = None) -> pd.DataFrame:
+    """Summarises the records (by default all records) per stage, or per any other combination of record fields (e.g. ['pp', 'stage']).
+    Returns a DataFrame with the amount of calls, the total, mean and max time, the rows processed per second and, when traced, the mean allocated and max peak memory, with the slowest stages first.
+    """
+    df = pd.DataFrame(records if stage_records is None else stage_records)
+    if df.empty:
+        return df
+    by = by or ['stage']
+    df['rows'] = df['rows'].astype(float)
+    aggregations = {'calls': ('duration', 'size'), 'total_s': ('duration', 'sum'), 'mean_ms': ('duration', 'mean'), 'max_ms': ('duration', 'max'), 'rows': ('rows', 'sum')}
+    memory_cols = {'allocated': ('mean_allocated_MB', 'mean'), 'peak': ('max_peak_MB', 'max')} # The memory columns, which are only there when the allocations were traced
+    memory_cols = {col: aggregation for col, aggregation in memory_cols.items() if col in df}
+    aggregations = {**aggregations, **{name: (col, function) for col, (name, function) in memory_cols.items()}}
+    summary = df.groupby(by, dropna=False).agg(**aggregations)
+    summary[['mean_ms', 'max_ms']] *= 1000
+    summary['rows_per_s'] = np.where(summary['rows'] > 0, summary['rows'] / summary['total_s'], np.nan)
+    for name, _ in memory_cols.values():
+        summary[name] /= 2**20
+    summary = summary.reset_index().sort_values(by[:-1] + ['total_s'], ascending=[True]*(len(by) - 1) + [False]) # The slowest stages first (within each participant when summarised per participant)
+    return summary.set_index(by)
+
+
+def print_summary(by: list = None, stage_records: list = None):
+    """Prints the summary of the records (see summarise) as a table."""
+    summary = summarise(by, stage_records)
+    if summary.empty:
+        print('No stages were recorded')
+        return
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 250, 'display.float_format', '{:,.2f}'.format):
+        print(summary)
+
+
+def export_trace(path: str, stage_records: list = None):
+    """Exports the records (by default all records) to a Chrome trace file (JSON), with every call of a stage as a complete event on the timeline of its process and thread."""
+    stage_records = records if stage_records is None else stage_records
+    t0 = min([record['start'] for record in stage_records], default=0) # The trace starts at the first call
+    events = [] # Create a list to store the events in
+    for record in stage_records:
+        args = {key: int(record[key]) for key in ['pp', 'rows', 'allocated', 'peak'] if record.get(key) is not None} # Converted to int, since the pp id and rows can be NumPy integers
+        events.append({'name': record['stage'], 'cat': record['stage'].split('.')[0], 'ph': 'X', 'ts': (record['start'] - t0) * 1e6, 'dur': record['duration'] * 1e6,
+                       'pid': record['pid'], 'tid': record['tid'], 'args': args})
+    with open(path, 'w') as file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
@@ -0,0 +1,154 @@
+## Import the necessary packages
+import pandas as pd
+import numpy as np
+from . import eyeGeometry as eg
+from .features import BASELINE_FRAMES, compute_frame_emotions
+
+## The functions in this script compute the same features as the functions in features.py, but for many (overlapping) windows of one participant.
+## Instead of recomputing the statistics for every window, the frames of a participant are summarised once in prefix sums (cumulative sums),
+## after which the statistics of any window can be found by subtracting two rows of these prefix sums.
+## The windows are given by their positional bounds (lower, upper) in the video DataFrame, as returned by windowing.get_window_bounds.
+
+
+def compute_prefix_sums(values: np.ndarray) -> dict:
+    """Computes the prefix sums, prefix sums of squares and prefix counts of the non-NaN values of a (frames x columns) array. Returns these in a dict."""
+    values = np.asarray(values, dtype=float).reshape(len(values), -1) # Make sure the values are a 2 dimensional float array
+    valid = ~np.isnan(values) # The values that are not NaN, pandas skips the NaN values when computing the mean and std
+    count = valid.sum(axis=0) # The amount of non-NaN values per column
+    shift = np.divide(np.where(valid, values, 0).sum(axis=0), count, out=np.zeros(values.shape[1]), where=count > 0) # The mean of each column, used to center the values
+    centred = np.where(valid, values - shift, 0) # Center the values, so the sums of squares do not lose precision, and set the NaN values to zero
+    zeros = np.zeros((1, values.shape[1])) # The prefix sums start with a row of zeros, so the sum of the rows [lower, upper) is prefix[upper] - prefix[lower]
+
+    prefix = {} # Create the dict to store the prefix sums
+    prefix['shift'] = shift
+    prefix['count'] = np.vstack((zeros, np.cumsum(valid, axis=0))) # The prefix count of non-NaN values
+    prefix['sum'] = np.vstack((zeros, np.cumsum(centred, axis=0))) # The prefix sum of the centred values
+    prefix['sum_sq'] = np.vstack((zeros, np.cumsum(centred**2, axis=0))) # The prefix sum of the squared centred values
+    return prefix # Return the prefix sums in a dict
+
+
+def window_mean(prefix: dict, lower: int, upper: int) -> np.ndarray:
+    """Computes the mean of each column in the window [lower, upper), skipping NaN values. Returns an array with a mean for each column."""
+    n = prefix['count'][upper] - prefix['count'][lower] # The amount of non-NaN values in the window
+    total = prefix['sum'][upper] - prefix['sum'][lower] # The sum of the centred values in the window
+    return np.divide(total, n, out=np.full(len(n), np.nan), where=n > 0) + prefix['shift'] # Divide by the amount of values and undo the centring, columns without values get NaN
+
+
+def window_std(prefix: dict, lower: int, upper: int, ddof: int = 1) -> np.ndarray:
+    """Computes the standard deviation of each column in the window [lower, upper), skipping NaN values. Returns an array with a std for each column."""
+    n = prefix['count'][upper] - prefix['count'][lower] # The amount of non-NaN values in the window
+    total = prefix['sum'][upper] - prefix['sum'][lower] # The sum of the centred values in the window
+    total_sq = prefix['sum_sq'][upper] - prefix['sum_sq'][lower] # The sum of the squared centred values in the window
+    squared_error = total_sq - np.divide(total**2, n, out=np.zeros(len(n)), where=n > 0) # The sum of squared deviations from the window mean
+    var = np.divide(squared_error, n - ddof, out=np.full(len(n), np.nan), where=n > ddof) # Divide by the degrees of freedom, like pandas this is NaN if there are not enough values
+    return np.sqrt(np.maximum(var, 0)) # Rounding errors can make a variance of (almost) zero slightly negative
+
+
+def compute_sparse_table(values: np.ndarray) -> list:
+    """Computes a sparse table of a 1 dimensional array, in which level k holds the max of each run of 2**k values, NaN values are ignored. Returns the levels in a list."""
+    table = [np.where(np.isnan(values), -np.inf, values)] # The first level are the values themselves, NaN values are set to -inf so they are never the max
+    k = 1
+    while 2**k <= len(values): # Each next level combines two runs of the previous level
+        previous = table[-1]
+        table.append(np.maximum(previous[:-2**(k-1)], previous[2**(k-1):]))
+        k += 1
+    return table # Return the list of levels
+
+
+def window_max(table: list, lower: int, upper: int) -> float:
+    """Computes the max of the window [lower, upper) from a sparse table, by taking the max of two (overlapping) runs that cover the window."""
+    k = int(upper - lower).bit_length() - 1 # The largest level whose runs fit in the window
+    result = max(table[k][lower], table[k][upper - 2**k]) # Combine the run at the start and the run at the end of the window
+    return result if result > -np.inf else np.nan # A window without values has no max
+
+
+def prepare_video(video_data: pd.DataFrame) -> dict:
+    """Summarises the video DataFrame of one participant in prefix sums, so the features of every window can be computed without revisiting the frames. Returns these in a dict."""
+    prepared = {} # Create the dict to store the prefix sums in
+
+    ## FAU intensities, used by compute_mean_AUs and compute_std_AUs
+    AU_cols = [col for col in video_data.columns if col.startswith('AU') & col.endswith('_r')] # Get FAU intensity columns
+    AU = video_data[AU_cols].values.astype(float) # The FAU intensities as an array
+    baseline = video_data[AU_cols].rolling(BASELINE_FRAMES, min_periods=1).mean().values # The rolling baseline over the full participant, which equals the baseline inside a window once the window holds a full baseline
+    prepared['AU_cols'] = AU_cols
+    prepared['AU_valid'] = ~np.isnan(AU)
+    prepared['AU'] = compute_prefix_sums(AU)
+    prepared['AU_baseline'] = np.vstack((np.zeros((1, len(AU_cols))), np.cumsum(np.where(prepared['AU_valid'], baseline, 0), axis=0))) # The prefix sum of the baseline of the non-NaN frames
+
+    ## Head pose, used by compute_head_motion
+    prepared['pose_cols'] = [col for col in video_data.columns if col.startswith('pose')] # Get the columns relevant for head pose
+    prepared['pose'] = compute_prefix_sums(video_data[prepared['pose_cols']].values)
+
+    ## Emotions, used by compute_emotions. We first compute the emotion of each frame, exactly like compute_emotions does
+    emotions = pd.DataFrame(compute_frame_emotions(video_data))
+    prepared['emotions'] = compute_prefix_sums(emotions.values)
+
+    ## Pupil diameter, used by compute_PD_features. The geometry of the eyes is computed once for all frames
+    geometry = eg.compute_eye_geometry(eg.get_eye_landmarks(video_data))
+    prepared['PD'] = compute_prefix_sums(geometry['PD'])
+    prepared['PD_max'] = compute_sparse_table(geometry['PD'])
+
+    ## Blinks, used by compute_blink_rate
+    prepared['blinks'] = np.concatenate(([0], np.cumsum(video_data['AU45_c'].diff().values == 1))) # The prefix count of the frames in which a blink starts
+    prepared['t_from_start'] = video_data['t_from_start'].values
+    return prepared # Return the dict
+
+
+def compute_mean_AUs(prepared: dict, lower: int, upper: int) -> dict:
+    """Computes the mean intensity and mean change in intensity for all FAUs in the window [lower, upper) and returns this in a dict. See features.compute_mean_AUs."""
+    processed = {} # Create the dict to store the results
+    n = prepared['AU']['count'][upper] - prepared['AU']['count'][lower] # The amount of non-NaN frames of each FAU in the window
+    mean = window_mean(prepared['AU'], lower, upper) # Compute the mean intensity
+
+    ## The rolling baseline restarts at the start of each window, so the first frames of a window are corrected with the mean of the frames since the start of the window
+    warm_up = min(lower + BASELINE_FRAMES - 1, upper) # The first frame of the window that has a full baseline within the window
+    count = prepared['AU']['count'][lower+1:warm_up+1] - prepared['AU']['count'][lower] # The amount of non-NaN frames since the start of the window
+    total = prepared['AU']['sum'][lower+1:warm_up+1] - prepared['AU']['sum'][lower] # The sum of the centred intensities since the start of the window
+    baseline = np.divide(total, count, out=np.zeros(total.shape), where=count > 0) + prepared['AU']['shift'] # The baseline of each of the first frames
+    baseline_sum = np.where(prepared['AU_valid'][lower:warm_up], baseline, 0).sum(axis=0) # The sum of the baseline of the non-NaN first frames
+    baseline_sum += prepared['AU_baseline'][upper] - prepared['AU_baseline'][warm_up] # Add the sum of the baseline of the remaining frames, which equals the baseline over the full participant
+    change = mean - np.divide(baseline_sum, n, out=np.full(len(n), np.nan), where=n > 0) # The mean change is the mean of the intensity minus the mean of the baseline
+
+    for i, AU in enumerate(prepared['AU_cols']): # For each FAU intensity col
+        processed[f'mean_{AU[:-2]}'] = mean[i] # Store the mean intensity
+        processed[f'mean_change_{AU[:-2]}'] = change[i] # Store the mean change
+    return processed # Return the results in a dict
+
+
+def compute_std_AUs(prepared: dict, lower: int, upper: int) -> dict:
+    """Computes the standard deviation of intensity for all FAUs in the window [lower, upper) and returns this in a dict. See features.compute_std_AUs."""
+    std = window_std(prepared['AU'], lower, upper) # Compute the standard deviation of the intensity
+    return {f'std_{AU[:-2]}': std[i] for i, AU in enumerate(prepared['AU_cols'])} # Return the results in a dict
+
+
+def compute_emotions(prepared: dict, lower: int, upper: int) -> dict:
+    """Computes emotions based on Imotions in the window [lower, upper) and returns these in a dict. See features.compute_emotions."""
+    mean = window_mean(prepared['emotions'], lower, upper) # Compute the average of each emotion
+    return {'mean_Happy': mean[0], 'mean_Sad': mean[1], 'mean_Angry': mean[2], 'mean_Scared': mean[3]} # Return the results in a dict
+
+
+def compute_head_motion(prepared: dict, lower: int, upper: int) -> dict:
+    """Computes various measures for head motion in the window [lower, upper) and returns these in a dictionary. See features.compute_head_motion."""
+    processed = {} # Create the dict to store the results
+    std = window_std(prepared['pose'], lower, upper) # Compute the standard deviation for each of the 6 pose cols
+    for i, col in enumerate(prepared['pose_cols']): # For each of the relevant columns
+        processed[f'std_{col}'] = std[i]
+    translation = [std[i] for i, col in enumerate(prepared['pose_cols']) if col.startswith('pose_T')] # Get the std of the 3 translation pose collumns
+    processed['compound_Motion'] = pd.Series(translation, dtype=float).mean() # Compute the mean of the std of all 3 cols
+    return processed # Return the results in a dict
+
+
+def compute_PD_features(prepared: dict, lower: int, upper: int) -> dict:
+    """Computes various features concerning the pupil diameter (PD) in the window [lower, upper). Returns these results in a dict. See features.compute_PD_features."""
+    processed = {} # Create the dict to store the results
+    processed['mean_PD'] = window_mean(prepared['PD'], lower, upper)[0] # Compute the average PD throughout the signal
+    processed['std_PD'] = window_std(prepared['PD'], lower, upper, ddof=0)[0] # Compute the standard deviation of the PD throughout the signal
+    processed['max_PD'] = window_max(prepared['PD_max'], lower, upper) # Compute the max PD throughout the signal
+    return processed # Return the results in a dict
+
+
+def compute_blink_rate(prepared: dict, lower: int, upper: int) -> float:
+    """Compute the amount of blinks per minute (blink_rate) in the window [lower, upper) and returns the result as a float. See features.compute_blink_rate."""
+    blinks = prepared['blinks'][upper] - prepared['blinks'][lower+1] # Get the number of blinks, a blink in the first frame of the window is not counted since it has no previous frame
+    seconds = prepared['t_from_start'][upper-1] - prepared['t_from_start'][lower] # Get the amount of seconds in the window
+    return blinks/seconds*60 # Return the amount of blinks per minute
@@ -0,0 +1,231 @@
+## Import the necessary packages
+import pandas as pd
+import numpy as np
+import os
+import time
+from .slidingFeatures import compute_prefix_sums, window_mean, window_std
+from . import profiling as prof
+from . import paths
+
+## The data directory is only resolved when a baseline file is first read (see paths.py), and NeuroKit2, which takes seconds to import,
+## is only imported when a target is first computed (see get_neurokit), so worker processes and scripts that import this module start fast.
+
+## The baseline statistics files that are computed in the notebook `3-ak-target-variable`, stored as: name: (subdirectory, file, column)
+BASELINE_FILES = {'mean_SCL_Baseline': ('SCL stats', 'PP_meanSCL_Baseline.csv', 'mean_SCL'),
+                  'min_SCL_Baseline': ('SCL stats', 'PP_minSCL_Baseline.csv', 'min_SCL'),
+                  'mean_SCL_all': ('SCL stats', 'PP_meanSCL_all.csv', 'mean_SCL'),
+                  'std_SCL_all': ('SCL stats', 'PP_stdSCL_all.csv', 'std_SCL'),
+                  'max_SCL_all': ('SCL stats', 'PP_maxSCL_all.csv', 'max_SCL'),
+                  'HRV_RMSSD_Baseline': ('HRV stats', 'PP_RMSSD_Baseline.csv', 'HRV_RMSSD'),
+                  'HRV_MeanNN_Baseline': ('HRV stats', 'PP_MeanNN_Baseline.csv', 'HRV_MeanNN'),
+                  'HRV_SDNN_Baseline': ('HRV stats', 'PP_SDNN_Baseline.csv', 'HRV_SDNN')}
+CHECK_INTERVAL = 10 # The amount of seconds after which the modification times of the baseline files are checked again
+baseline_store = {} # The loaded baseline statistics, stored as: name: {'mtime': modification time of the file, 'checked': when this was last checked, 'values': {pp: value}}
+
+HRV_SAMPLING_RATE = 1000 # compute_ECG_Targets calls ecg_intervalrelated with this sampling rate, so NeuroKit2 converts the R-peaks to ms as if the native signal was sampled at 1000 Hz
+
+## Note on the unit of the HRV measures: the physio recordings are sampled at 2000 Hz, but the HRV measures of the windows (and the baseline statistics of
+## `3-ak-target-variable`, which call ecg_intervalrelated with its default rate) are computed as if the signal was sampled at HRV_SAMPLING_RATE.
+## So HRV_MeanNN, HRV_RMSSD and HRV_SDNN are reported at twice the true interval (in units of half a ms). The windows and the baselines use the same
+## unit, so the corrected targets are consistent, but they are twice the difference in ms. The unit is kept so the targets stay comparable with the
+## existing baseline files and models; on a decimated level the rate is scaled with the decimation factor, so every level reports the same unit.
+
+## The lowest rate (in Hz) at which each group of targets can be computed when the signal store has a decimated level of its channel (see signalStore.PYRAMID), stored as: group: (channel, rate).
+## The EDA targets only need the tonic signal (< 1 Hz) and the SCRs (< 5 Hz). The R-peaks of the ECG need a few ms precision for the HRV measures, but at
+## 500 Hz the peak detection of NeuroKit2 can find one R-peak more or less in a window than at the native rate, which changes its RMSSD and SDNN by
+## more than 10 ms. So by default only the groups in DECIMATED_GROUPS are computed from their level, the ECG level is opt-in (see sampling.sample_windows).
+## How much the targets (and the amount of R-peaks of each window) differ from those at the native rate can be inspected with the script `validate_decimation.py`.
+TARGET_RATES = {'EDA': ('raw_EDA', 25), 'ECG': ('raw_ECG', 500)}
+DECIMATED_GROUPS = ['EDA'] # The groups that are computed from their level in TARGET_RATES by default
+
+
+def get_neurokit():
+    """Returns the NeuroKit2 module, which is imported on the first call."""
+    import neurokit2 # Only slow the first time, after that the module is taken from sys.modules
+    return neurokit2
+
+
+def get_baseline(pp: int, names: list) -> dict:
+    """Gets the baseline statistics (see BASELINE_FILES) of a pp. Each file is only read once, and read again when it has been modified. Returns the statistics in a dict."""
+    baseline = {} # Create the dict to store the statistics of the pp in
+    for name in names: # For each of the requested statistics
+        subdir, file, col = BASELINE_FILES[name]
+        stored = baseline_store.get(name) # Get the statistic if it was already loaded
+        now = time.monotonic()
+        if stored is None or now - stored['checked'] > CHECK_INTERVAL: # If the file was not loaded yet, or its modification time was not checked recently
+            path = paths.get_dir('information') / subdir / file
+            mtime = os.path.getmtime(path) # Get the modification time of the file
+            if stored is None or mtime != stored['mtime']: # If the file is not loaded yet or has changed, (re)load the file
+                with prof.stage('read_baseline'):
+                    stored = {'mtime': mtime, 'values': pd.read_csv(path, index_col=0)[col].to_dict()}
+            stored['checked'] = now
+            baseline_store[name] = stored
+        baseline[name] = stored['values'][pp] # Get the value that corresponds to the pp id
+    return baseline # Return the dict
+
+
+def compute_EDA_Targets(physio_data: pd.DataFrame, decimation: int = 1) -> dict:
+    """Computes the EDA Target variables from an abritray dataframe containing the raw EDA signal. Returns these target variables in a dict.
+    decimation is the factor by which the signal was decimated (see signalStore.py), the EDA targets do not depend on it.
+    """
+    
+    pp = physio_data.pp.values[0] # Get the pp id
+    
+    ## Get the baseline, and all descriptives that correspond to the current pp id and store these in corresponding variables
+    baseline = get_baseline(pp, ['mean_SCL_Baseline', 'min_SCL_Baseline', 'mean_SCL_all', 'std_SCL_all', 'max_SCL_all'])
+    ## Baseline descriptives
+    mean_Baseline = baseline['mean_SCL_Baseline']
+    min_Baseline = baseline['min_SCL_Baseline']
+    ## All Descriptives
+    mean_all = baseline['mean_SCL_all']
+    std_all = baseline['std_SCL_all']
+    max_all = baseline['max_SCL_all']
+    
+    processed = {} # Create the dict to store the target variables in and which is returned later in the function
+    
+    df = physio_data.dropna() # Drop the empty rows in the function (this occurs due to differences in sampling frequency between ECG and EDA signal in the AMSDATA files)
+    
+    freq=round(1/(df.t_from_start.values[1] - df.t_from_start.values[0])) # Calculate the frequency at which the raw EDA signal was sampled 
+    seconds = df.t_from_start.values[-1] - df.t_from_start.values[0] # Calculate the amount seconds the physio signal contains
+    
+    nk = get_neurokit() # Import NeuroKit2 on the first call
+    with prof.stage('nk.eda_process', rows=len(df)):
+        signals, info = nk.eda_process(physio_data.raw_EDA.dropna(), sampling_rate=freq) # Process the EDA signals using the eda_process function from NeuroKit2
+    
+    ## Compute various EDA target variables and store these in the dict. Also add the pp id to the dict and return this dict
+    processed['mean_SCL'] = signals.EDA_Tonic.mean() # Compute the mean SCL signal
+    processed['corrected_mean_SCL'] = processed['mean_SCL'] - mean_Baseline # Compute the corrected mean SCL, by subtracting the mean SCL from the baseline component
+    processed['range_corrected_mean_SCL'] = ((signals.EDA_Tonic - min_Baseline) / (max_all - min_Baseline)).mean() # Compute the range corected min SCL, by Min Max scaling the signal and before computing the mean
+    processed['standardised_mean_scl'] = ((signals.EDA_Tonic - mean_all) / std_all).mean() # Compute the standarised mean SCL, by standardising using the mean and std SCL throughout all the active components
+    processed['frequency_NS_SCR'] = len(info['SCR_Peaks'])/seconds * 60 # Compute the frequency in which Non-Stimulus Skin Conductance Responses (NS-SCRs) occured, which is a EDA measures related to the Phasic component
+    return processed
+
+def detect_R_peaks(physio_data: pd.DataFrame) -> pd.DataFrame:
+    """Cleans the raw ECG signal of an arbitrary dataframe and detects its R-peaks with NeuroKit2. Returns the signals of ecg_process in a DataFrame (the R-peaks in the ECG_R_Peaks column)."""
+    freq=round(1/(physio_data.t_from_start.values[1] - physio_data.t_from_start.values[0])) # Calculate the frequency at which the raw ECG signal was sampled
+    nk = get_neurokit() # Import NeuroKit2 on the first call
+    with prof.stage('nk.ecg_process', rows=len(physio_data)):
+        ecg_signals, info = nk.ecg_process(physio_data["raw_ECG"], sampling_rate=freq) # Get the clean ECG signal using the ecg_process function from neurokit2
+    return ecg_signals
+
+
+def compute_ECG_Targets(physio_data: pd.DataFrame, decimation: int = 1, ecg_signals: pd.DataFrame = None) -> dict:
+    """Computes the ECG Target variables from an abritray dataframe containing the raw ECG signal. Returns these target variables in a dict.
+    decimation is the factor by which the signal was decimated (see signalStore.py), so the HRV measures are in the same unit as at the native rate.
+    ecg_signals are the signals of detect_R_peaks, when the R-peaks of the window were already detected (see validate_decimation.py).
+    """
+    
+    pp = physio_data.pp.values[0] # Get the pp id
+    
+    # Get the baseline HRV measures that correspond to the current pp id and store these in corresponding variables
+    baseline = get_baseline(pp, ['HRV_RMSSD_Baseline', 'HRV_MeanNN_Baseline', 'HRV_SDNN_Baseline'])
+    HRV_RMSSD_baseline = baseline['HRV_RMSSD_Baseline']
+    HRV_MeanNN_baseline = baseline['HRV_MeanNN_Baseline']
+    HRV_SDNN_baseline = baseline['HRV_SDNN_Baseline']
+    
+    processed = {} # Create the dict to store the target variables in and which is returned later in the function
+    
+    if ecg_signals is None:
+        ecg_signals = detect_R_peaks(physio_data) # Get the clean ECG signal and its R-peaks
+    nk = get_neurokit()
+    with prof.stage('nk.ecg_intervalrelated', rows=len(ecg_signals)):
+        ecg_features = nk.ecg_intervalrelated(ecg_signals, sampling_rate=HRV_SAMPLING_RATE / decimation) # Compute HRV measures using the ecg_intervalrelated function from NeuroKit2 (see HRV_SAMPLING_RATE)
+    
+    ## Compute various HRV target variables and store these in the dict. Also add the pp id to the dict and return this dict
+    ## Some NeuroKit2 versions return the HRV measures as a nested array, so they are converted to plain floats (which can be stored in the window cache)
+    processed['HRV_MeanNN'] = float(np.squeeze(ecg_features['HRV_MeanNN'].values[0])) # Store the mean of the time interval between the NN peaks
+    processed['HRV_RMSSD'] = float(np.squeeze(ecg_features['HRV_RMSSD'].values[0])) # Store the Root Mean Squared Standard deviation of the time interval between the NN peaks
+    processed['HRV_SDNN'] = float(np.squeeze(ecg_features['HRV_SDNN'].values[0])) # Store the standard deviation of the time interval between the NN peaks
+    processed['HRV_MeanNN_corrected'] = processed['HRV_MeanNN'] - HRV_MeanNN_baseline # Correct the meanNN by subtracting with the meanNN from the baseline component and store this 
+    processed['HRV_RMSSD_corrected'] = processed['HRV_RMSSD'] - HRV_RMSSD_baseline # Correct the RMSSD by subtracting with the RMSSD from the baseline component and store this
+    processed['HRV_SDNN_corrected'] = processed['HRV_SDNN'] - HRV_SDNN_baseline # Correct the SDNN by subtracting with the SDNN from the baseline component and store this
+    return processed
+
+
+## The functions below are an alternative to compute_EDA_Targets and compute_ECG_Targets for many (overlapping) windows of one participant.
+## Instead of processing the raw signal of every window with NeuroKit2, prepare_physio cleans the continuous recording of a participant,
+## decomposes the EDA signal and detects the SCR and R-peaks only once. The targets of a window are then computed from the tonic signal and
+## the peaks that fall inside the window, given by its positional bounds (lower, upper) in the physio DataFrame (see windowing.get_window_bounds).
+## Because the signal is filtered and the peaks are detected over the whole recording, the results differ slightly from the per window
+## functions (no filter edge effects at the window borders, and peak thresholds relative to the whole recording). These differences can be
+## inspected with the script `compare_physio_targets.py`.
+
+def prepare_physio(physio_data: pd.DataFrame) -> dict:
+    """Processes the EDA and ECG signal of the continuous recording of one participant once with NeuroKit2. Returns the tonic signal and peaks, summarised in prefix sums, in a dict."""
+    prepared = {} # Create the dict to store the processed signals in
+    prepared['pp'] = physio_data.pp.values[0] # Get the pp id
+    prepared['t_from_start'] = physio_data.t_from_start.values
+    prepared['complete'] = np.flatnonzero(physio_data.notna().all(axis=1).values) # The positions of the rows without empty values, which compute_EDA_Targets uses to compute the length of the window
+
+    ## EDA: the positions of the rows with an EDA value, the tonic signal and the positions of the SCR peaks (relative to the rows with an EDA value)
+    prepared['EDA_rows'] = np.flatnonzero(physio_data.raw_EDA.notna().values)
+    t = prepared['t_from_start'][prepared['complete']]
+    freq=round(1/(t[1] - t[0])) # Calculate the frequency at which the raw EDA signal was sampled
+    nk = get_neurokit() # Import NeuroKit2 on the first call
+    with prof.stage('nk.eda_process', rows=len(prepared['EDA_rows'])):
+        signals, info = nk.eda_process(physio_data.raw_EDA.dropna(), sampling_rate=freq) # Process the EDA signals using the eda_process function from NeuroKit2
+    prepared['EDA_Tonic'] = compute_prefix_sums(signals.EDA_Tonic.values)
+    prepared['SCR_Peaks'] = np.sort(np.asarray(info['SCR_Peaks'], dtype=int))
+
+    ## ECG: the positions of the rows with an ECG value, and the R-R intervals (in ms) between the R-peaks (relative to the rows with an ECG value)
+    prepared['ECG_rows'] = np.flatnonzero(physio_data.raw_ECG.notna().values)
+    t = prepared['t_from_start'][prepared['ECG_rows']]
+    freq=round(1/(t[1] - t[0])) # Calculate the frequency at which the raw ECG signal was sampled
+    ## Only the cleaning and R-peak detection steps of ecg_process are needed for the HRV measures, the rate, quality and delineation steps are skipped
+    with prof.stage('nk.ecg_clean', rows=len(prepared['ECG_rows'])):
+        ecg_cleaned = nk.ecg_clean(physio_data.raw_ECG.dropna(), sampling_rate=freq) # Get the clean ECG signal, like ecg_process does
+    with prof.stage('nk.ecg_peaks', rows=len(prepared['ECG_rows'])):
+        _, info = nk.ecg_peaks(ecg_cleaned, sampling_rate=freq, correct_artifacts=True) # Get the R-peaks, like ecg_process does
+    prepared['R_Peaks'] = np.sort(np.asarray(info['ECG_R_Peaks'], dtype=int))
+    ## The same conversion to ms as compute_ECG_Targets is used (see HRV_SAMPLING_RATE), so both pipelines give the same HRV measures
+    rri = np.diff(prepared['R_Peaks']) / HRV_SAMPLING_RATE * 1000 # The time interval between consecutive R-peaks in ms
+    prepared['RRI'] = compute_prefix_sums(rri)
+    prepared['RRI_diff_sq'] = compute_prefix_sums(np.diff(rri)**2) # The squared successive differences of the intervals
+    return prepared # Return the dict
+
+
+def compute_EDA_Targets_prepared(prepared: dict, lower: int, upper: int) -> dict:
+    """Computes the EDA Target variables of the window [lower, upper) from the processed recording of a participant (see prepare_physio). Returns these target variables in a dict."""
+    pp = prepared['pp'] # Get the pp id
+
+    ## Get the baseline, and all descriptives that correspond to the current pp id
+    baseline = get_baseline(pp, ['mean_SCL_Baseline', 'min_SCL_Baseline', 'mean_SCL_all', 'std_SCL_all', 'max_SCL_all'])
+
+    processed = {} # Create the dict to store the target variables in and which is returned later in the function
+
+    complete = prepared['complete'][np.searchsorted(prepared['complete'], lower):np.searchsorted(prepared['complete'], upper)] # The rows without empty values in the window
+    seconds = prepared['t_from_start'][complete[-1]] - prepared['t_from_start'][complete[0]] # Calculate the amount seconds the physio signal contains
+
+    first, last = np.searchsorted(prepared['EDA_rows'], [lower, upper]) # The bounds of the window in the EDA signal
+    n_peaks = np.diff(np.searchsorted(prepared['SCR_Peaks'], [first, last]))[0] # The amount of SCR peaks inside the window
+
+    ## Compute various EDA target variables and store these in the dict. The corrected targets are linear in the tonic signal, so they follow from its mean
+    processed['mean_SCL'] = window_mean(prepared['EDA_Tonic'], first, last)[0] # Compute the mean SCL signal
+    processed['corrected_mean_SCL'] = processed['mean_SCL'] - baseline['mean_SCL_Baseline'] # Compute the corrected mean SCL, by subtracting the mean SCL from the baseline component
+    processed['range_corrected_mean_SCL'] = (processed['mean_SCL'] - baseline['min_SCL_Baseline']) / (baseline['max_SCL_all'] - baseline['min_SCL_Baseline']) # Compute the range corected min SCL, by Min Max scaling the signal
+    processed['standardised_mean_scl'] = (processed['mean_SCL'] - baseline['mean_SCL_all']) / baseline['std_SCL_all'] # Compute the standarised mean SCL, by standardising using the mean and std SCL throughout all the active components
+    processed['frequency_NS_SCR'] = n_peaks/seconds * 60 # Compute the frequency in which Non-Stimulus Skin Conductance Responses (NS-SCRs) occured
+    return processed
+
+
+def compute_ECG_Targets_prepared(prepared: dict, lower: int, upper: int) -> dict:
+    """Computes the ECG Target variables of the window [lower, upper) from the processed recording of a participant (see prepare_physio). Returns these target variables in a dict."""
+    pp = prepared['pp'] # Get the pp id
+
+    # Get the baseline HRV measures that correspond to the current pp id
+    baseline = get_baseline(pp, ['HRV_RMSSD_Baseline', 'HRV_MeanNN_Baseline', 'HRV_SDNN_Baseline'])
+
+    processed = {} # Create the dict to store the target variables in and which is returned later in the function
+
+    first, last = np.searchsorted(prepared['ECG_rows'], [lower, upper]) # The bounds of the window in the ECG signal
+    first_peak, last_peak = np.searchsorted(prepared['R_Peaks'], [first, last]) # The R-peaks inside the window
+    n_intervals = max(last_peak - first_peak - 1, 0) # The amount of intervals between the R-peaks inside the window
+
+    ## Compute the HRV measures in the same way as NeuroKit2 (hrv_time) does from the intervals inside the window
+    processed['HRV_MeanNN'] = window_mean(prepared['RRI'], first_peak, first_peak + n_intervals)[0] # Store the mean of the time interval between the NN peaks
+    processed['HRV_RMSSD'] = np.sqrt(window_mean(prepared['RRI_diff_sq'], first_peak, first_peak + max(n_intervals - 1, 0))[0]) # Store the Root Mean Squared Standard deviation of the time interval between the NN peaks
+    processed['HRV_SDNN'] = window_std(prepared['RRI'], first_peak, first_peak + n_intervals)[0] # Store the standard deviation of the time interval between the NN peaks
+    processed['HRV_MeanNN_corrected'] = processed['HRV_MeanNN'] - baseline['HRV_MeanNN_Baseline'] # Correct the meanNN by subtracting with the meanNN from the baseline component and store this
+    processed['HRV_RMSSD_corrected'] = processed['HRV_RMSSD'] - baseline['HRV_RMSSD_Baseline'] # Correct the RMSSD by subtracting with the RMSSD from the baseline component and store this
+    processed['HRV_SDNN_corrected'] = processed['HRV_SDNN'] - baseline['HRV_SDNN_Baseline'] # Correct the SDNN by subtracting with the SDNN from the baseline component and store this
+    return processed
@@ -0,0 +1,584 @@
+# -*- coding: utf-8 -*-
+"""Streaming stress inference on OpenFace frames.
+
+Estimates the targets of the models of `6-ak-modelling` (the standardised mean
+SCL and the corrected HRV SDNN) while a session is running. The frames arrive
+one CSV row at a time: from an OpenFace CSV file that is still being written
+(--tail), from a local socket (--listen) or from a recorded CSV that is
+replayed at real time or faster (--replay, or the replay command, which feeds
+a file or socket for the other two).
+
+The video features of `features.py` are kept up to date incrementally over a
+ring buffer of the frames of the current window: every frame adds its values
+to running sums (and sums of squares), and the frames that leave the window
+subtract theirs, so a window costs a few vector operations per frame instead
+of a pass over all its frames. The 60 second rolling baseline of the FAUs
+(used by the mean change and the arousal) is kept in the same way over the
+last 60 seconds of frames. Only the first 60 seconds of a window, in which the
+baseline of `features.py` restarts at the start of the window, are recomputed
+when a window is closed. Whenever a window is complete (every step), its
+features are passed to the models in a worker thread, so a slow model does not
+hold up the frames.
+
+The constants (frame rate, quality rules, FAUs and emotions) and the per
+frame computations (emotions, arousal and pupil diameter) are shared with
+the offline features, see src/features/features.py and eyeGeometry.py.
+The windows are keyed on the OpenFace `frame` column, as
+(frame - start frame) / FPS, which is the time base of the `t_from_start` of
+`4-ak-window-sampling` (see openFace.load_openface_csv). The OpenFace
+`timestamp` is only used to pace a replay. With --start-frame set to the
+frame at which the speech component starts, the windows start and end at
+the same times as the offline windows. Without it the first frame is taken
+as the start, which shifts the reported start and end by a constant, but
+does not change the frames in each window.
+"""
+import json
+import time
+import socket
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import click
+import joblib
+import numpy as np
+from dotenv import find_dotenv, load_dotenv
+
+from src.features import eyeGeometry as eg
+from src.features.features import (AUS, BASELINE_FRAMES, CONFIDENCE_THRESHOLD,
+                                   EMOTIONS, FPS, MIN_GOOD_FRAMES,
+                                   compute_frame_arousal,
+                                   compute_frame_emotions,
+                                   compute_rolling_mean)
+
+RESYNC_FRAMES = 10 * 60 * FPS
+
+AU_COLS = [f'AU{AU}_r' for AU in AUS]
+POSE_COLS = ['pose_Tx', 'pose_Ty', 'pose_Tz', 'pose_Rx', 'pose_Ry', 'pose_Rz']
+
+# The columns of the OpenFace CSV that are read from every frame
+INPUT_COLS = (['frame', 'confidence'] + AU_COLS + ['AU45_c'] + POSE_COLS
+              + eg.LANDMARK_COLUMNS)
+IN_AU = slice(2, 2 + len(AUS))
+IN_BLINK = IN_AU.stop
+IN_POSE = slice(IN_BLINK + 1, IN_BLINK + 1 + len(POSE_COLS))
+IN_EYES = slice(IN_POSE.stop, len(INPUT_COLS))
+
+# The values that are kept of every frame in the ring buffer
+GOOD = 0
+AU = slice(1, 1 + len(AUS))
+POSE = slice(AU.stop, AU.stop + len(POSE_COLS))
+EMOTION = slice(POSE.stop, POSE.stop + len(EMOTIONS))
+PD = EMOTION.stop
+BASE = slice(PD + 1, PD + 1 + len(AUS))
+AROUSAL = BASE.stop
+BLINK = AROUSAL + 1
+N_COLUMNS = BLINK + 1
+
+AROUSAL_AUS = np.array([i for i, AU in enumerate(AUS) if AU != '45'])
+
+
+def create_stream(window_size, step_size, start_frame=None):
+    """Creates the state of a stream of frames, which is split in windows of
+    window_size seconds every step_size seconds, like windowing.get_start_end.
+    The time of a frame is (frame - start_frame) / FPS, like t_from_start;
+    without a start_frame the first frame of the stream is used.
+    """
+    capacity = int(max(window_size * FPS, BASELINE_FRAMES) * 1.25) + FPS
+    return {'window_size': window_size, 'step_size': step_size,
+            'start_frame': start_frame, 'capacity': capacity,
+            'times': np.full(capacity, np.nan),
+            'rows': np.full((capacity, N_COLUMNS), np.nan),
+            'n': 0, 'first': 0, 'start': None, 'end': None,
+            'shift': None, 'sums': np.zeros(N_COLUMNS),
+            'squares': np.zeros(N_COLUMNS), 'counts': np.zeros(N_COLUMNS),
+            'baseline_sum': np.zeros(len(AUS)),
+            'baseline_count': np.zeros(len(AUS)),
+            'previous_blink': np.nan, 'max_PD': deque(), 'since_resync': 0}
+
+
+def compute_PD(landmarks):
+    """Computes the pupil diameter of a frame from the X and Y coordinates of
+    its eye landmarks (eyeGeometry.LANDMARK_COLUMNS), as the average PD of
+    both eyes, like features.compute_avg_PD_2_eyes.
+    """
+    landmarks = landmarks.astype('float32').reshape(1, eg.EYE_LANDMARKS, 2)
+    return eg.compute_eye_geometry(landmarks)['PD'][0]
+
+
+def compute_frame(state, values):
+    """Computes the values that are kept of a frame (see the ring buffer
+    columns) from its input columns. Frames with a low confidence rating are
+    kept as NaN, like sampling.mask_frames.
+    """
+    row = np.full(N_COLUMNS, np.nan)
+    good = values[1] >= CONFIDENCE_THRESHOLD
+    row[GOOD] = good
+    if good:
+        row[AU] = values[IN_AU]
+        row[POSE] = values[IN_POSE]
+        emotions = compute_frame_emotions(dict(zip(AU_COLS, values[IN_AU])))
+        row[EMOTION] = list(emotions.values())
+        row[PD] = compute_PD(values[IN_EYES])
+    blink = values[IN_BLINK] if good else np.nan
+    row[BLINK] = blink - state['previous_blink'] == 1
+    state['previous_blink'] = blink
+    update_baseline(state, row)
+    return row
+
+
+def update_baseline(state, row):
+    """Adds a frame to the rolling baseline of the FAUs (the mean of the last
+    60 seconds of frames), and stores its baseline and arousal in the row.
+    """
+    valid = ~np.isnan(row[AU])
+    state['baseline_sum'] += np.where(valid, row[AU], 0)
+    state['baseline_count'] += valid
+    if state['n'] >= BASELINE_FRAMES:
+        position = (state['n'] - BASELINE_FRAMES) % state['capacity']
+        old = state['rows'][position, AU]
+        state['baseline_sum'] -= np.where(np.isnan(old), 0, old)
+        state['baseline_count'] -= ~np.isnan(old)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        baseline = state['baseline_sum'] / state['baseline_count']
+    row[BASE] = np.where(valid, baseline, np.nan)
+    changes = row[AU][AROUSAL_AUS] - baseline[AROUSAL_AUS]
+    row[AROUSAL] = compute_frame_arousal(changes[None])[0]
+
+
+def add_to_sums(state, rows, sign=1):
+    """Adds (sign=1) or removes (sign=-1) a (frames x columns) array of rows
+    to the running sums, sums of squares and counts of the window. The values
+    are shifted by the first frame, so the sums of squares stay precise.
+    """
+    values = rows - state['shift']
+    valid = ~np.isnan(values)
+    values = np.where(valid, values, 0)
+    state['sums'] += sign * values.sum(axis=0)
+    state['squares'] += sign * (values**2).sum(axis=0)
+    state['counts'] += sign * valid.sum(axis=0)
+
+
+def get_positions(state, first, stop):
+    """Gets the positions in the ring buffer of the frames first to stop."""
+    return np.arange(first, stop) % state['capacity']
+
+
+def resync(state):
+    """Recomputes the running sums from the frames in the ring buffer, so the
+    rounding errors of adding and removing frames do not add up.
+    """
+    rows = state['rows'][get_positions(state, state['first'], state['n'])]
+    for key in ['sums', 'squares', 'counts']:
+        state[key] = np.zeros(N_COLUMNS)
+    add_to_sums(state, rows)
+    first = max(state['n'] - BASELINE_FRAMES, 0)
+    AUs = state['rows'][get_positions(state, first, state['n']), AU]
+    state['baseline_sum'] = np.nansum(AUs, axis=0)
+    state['baseline_count'] = (~np.isnan(AUs)).sum(axis=0).astype(float)
+    state['since_resync'] = 0
+
+
+def grow(state):
+    """Doubles the size of the ring buffer, when a window has more frames
+    than fit in it (e.g. a camera with a higher frame rate).
+    """
+    capacity = 2 * state['capacity']
+    kept = np.arange(max(state['n'] - state['capacity'], 0), state['n'])
+    times, rows = np.full(capacity, np.nan), np.full((capacity, N_COLUMNS),
+                                                     np.nan)
+    times[kept % capacity] = state['times'][kept % state['capacity']]
+    rows[kept % capacity] = state['rows'][kept % state['capacity']]
+    state.update(capacity=capacity, times=times, rows=rows)
+
+
+def add_frame(state, t, values):
+    """Adds a frame to the ring buffer and the running sums of the window."""
+    if state['n'] - state['first'] >= state['capacity'] - 1:
+        grow(state)
+    row = compute_frame(state, values)
+    if state['shift'] is None:
+        state['shift'] = np.where(np.isnan(row), 0, row)
+    position = state['n'] % state['capacity']
+    state['times'][position], state['rows'][position] = t, row
+    add_to_sums(state, row[None])
+    if not np.isnan(row[PD]):
+        maxima = state['max_PD']
+        while maxima and maxima[-1][1] <= row[PD]:
+            maxima.pop()
+        maxima.append((state['n'], row[PD]))
+    state['n'] += 1
+    state['since_resync'] += 1
+    if state['since_resync'] >= RESYNC_FRAMES:
+        resync(state)
+
+
+def remove_old_frames(state):
+    """Removes the frames before the start of the window from the running
+    sums of the window.
+    """
+    first = state['first']
+    while (first < state['n']
+           and state['times'][first % state['capacity']] < state['start']):
+        first += 1
+    if first > state['first']:
+        positions = get_positions(state, state['first'], first)
+        add_to_sums(state, state['rows'][positions], sign=-1)
+        state['first'] = first
+        maxima = state['max_PD']
+        while maxima and maxima[0][0] < first:
+            maxima.popleft()
+
+
+def correct_warm_up(state, frames):
+    """Corrects the sums of the baseline and the arousal of the first 60
+    seconds of the window, in which the rolling baseline of features.py only
+    covers the frames of the window itself. Returns the mean baseline of each
+    FAU and the mean arousal of the window.
+    """
+    totals = state['shift'] * state['counts'] + state['sums']
+    rows = state['rows'][get_positions(
+        state, state['first'], state['first'] + min(BASELINE_FRAMES - 1,
+                                                    frames))]
+    AUs = rows[:, AU]
+    baseline = np.where(np.isnan(AUs), np.nan,
+                        compute_rolling_mean(AUs, BASELINE_FRAMES))
+    changes = AUs[:, AROUSAL_AUS] - baseline[:, AROUSAL_AUS]
+    baseline_total = (totals[BASE] - np.nansum(rows[:, BASE], axis=0)
+                      + np.nansum(baseline, axis=0))
+    arousal_total = (totals[AROUSAL] - np.nansum(rows[:, AROUSAL])
+                     + np.nansum(compute_frame_arousal(changes)))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (baseline_total / state['counts'][AU],
+                arousal_total / state['counts'][AROUSAL])
+
+
+def compute_window_features(state):
+    """Computes the video features of the current window (the features of
+    `6-ak-modelling`, see features.py) from the running sums. Returns a dict.
+    """
+    frames = state['n'] - state['first']
+    counts = state['counts']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = state['shift'] + state['sums'] / counts
+        squares = np.maximum(state['squares'] - state['sums']**2 / counts, 0)
+        std = np.sqrt(squares / (counts - 1))
+        std_PD = np.sqrt(squares[PD] / counts[PD])
+    baseline, arousal = correct_warm_up(state, frames)
+
+    features = {}
+    for i, AU_name in enumerate(AUS):
+        features[f'mean_AU{AU_name}'] = means[AU][i]
+        features[f'mean_change_AU{AU_name}'] = means[AU][i] - baseline[i]
+        features[f'std_AU{AU_name}'] = std[AU][i]
+    features['mean_Arousal'] = arousal
+    for emotion, mean in zip(EMOTIONS, means[EMOTION]):
+        features[f'mean_{emotion}'] = mean
+    for col, pose_std in zip(POSE_COLS, std[POSE]):
+        features[f'std_{col}'] = pose_std
+    translation = std[POSE][:3]
+    features['compound_Motion'] = (translation[~np.isnan(translation)].mean()
+                                   if (~np.isnan(translation)).any()
+                                   else np.nan)
+    features['mean_PD'], features['std_PD'] = means[PD], std_PD
+    features['max_PD'] = (state['max_PD'][0][1] if state['max_PD']
+                          else np.nan)
+    features['blink_rate'] = compute_blink_rate(state)
+    return features
+
+
+def compute_blink_rate(state):
+    """Computes the blinks per minute in the current window, like
+    features.compute_blink_rate: a blink at the first frame is not counted.
+    """
+    first = state['first'] % state['capacity']
+    last = (state['n'] - 1) % state['capacity']
+    total = state['shift'][BLINK] * state['counts'][BLINK]
+    blinks = round(total + state['sums'][BLINK] - state['rows'][first, BLINK])
+    seconds = state['times'][last] - state['times'][first]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.float64(blinks) / seconds * 60
+
+
+def close_window(state):
+    """Closes the current window: computes its features when enough of its
+    frames are good (see sampling.py), and moves on to the next window.
+    Returns a dict with the start, end, amount of frames, proportion of good
+    frames and the features (None for a window that is removed).
+    """
+    frames = state['n'] - state['first']
+    good = state['shift'][GOOD] * state['counts'][GOOD] + state['sums'][GOOD]
+    quality = good / frames if frames else np.nan
+    window = {'start': state['start'], 'end': state['end'],
+              'frames': frames, 'quality': quality, 'features': None}
+    if quality >= MIN_GOOD_FRAMES:
+        window['features'] = compute_window_features(state)
+    state['start'] += state['step_size']
+    state['end'] += state['step_size']
+    remove_old_frames(state)
+    return window
+
+
+def push_frame(state, values):
+    """Adds a frame (the INPUT_COLS of an OpenFace row, as an array) to the
+    stream. Returns a list of the windows that were completed (see
+    close_window), which is empty for most frames.
+    """
+    if state['start_frame'] is None:
+        state['start_frame'] = values[0]
+    t = (values[0] - state['start_frame']) / FPS
+    if state['start'] is None:
+        state['start'], state['end'] = t, t + state['window_size']
+    windows = []
+    while t > state['end']:
+        windows.append(close_window(state))
+    add_frame(state, t, values)
+    remove_old_frames(state)
+    if t == state['end']:
+        windows.append(close_window(state))
+    return windows
+
+
+def load_models(model_filepaths):
+    """Loads the models stored by `6-ak-modelling` (a dict with the model, its
+    features, target and window size). Returns a dict with a model per target.
+    """
+    models = {}
+    for filepath in model_filepaths:
+        model = joblib.load(filepath)
+        models[model['target']] = model
+    return models
+
+
+def predict_window(models, window, demographics):
+    """Predicts the target of each model from the features of a window and
+    the demographics of the participant. Returns a dict with a prediction per
+    target, or None for a window that was removed.
+    """
+    if window['features'] is None:
+        return None
+    features = {**window['features'], **demographics}
+    predictions = {}
+    for target, model in models.items():
+        X = np.array([[features[name] for name in model['features']]])
+        predictions[target] = float(model['model'].predict(X)[0])
+    return predictions
+
+
+def get_input_columns(header):
+    """Gets the positions of the INPUT_COLS in the header of an OpenFace CSV,
+    whose column names can start with a space.
+    """
+    names = [name.strip() for name in header.split(',')]
+    missing = [col for col in INPUT_COLS if col not in names]
+    if missing:
+        raise ValueError(f'The CSV misses the columns {missing}')
+    return np.array([names.index(col) for col in INPUT_COLS])
+
+
+def tail_lines(filepath, poll_interval=0.01, idle_timeout=None):
+    """Yields the lines of a CSV file that is still being written, waiting
+    for new lines. Stops after idle_timeout seconds without a new line.
+    """
+    while not Path(filepath).exists():
+        time.sleep(poll_interval)
+    idle, partial = 0, ''
+    with open(filepath) as file:
+        while idle_timeout is None or idle < idle_timeout:
+            partial += file.readline()
+            if partial.endswith('\n'):
+                yield partial
+                idle, partial = 0, ''
+            else:
+                time.sleep(poll_interval)
+                idle += poll_interval
+
+
+def socket_lines(host, port):
+    """Yields the lines sent by the first client that connects to a local
+    socket, until the client closes the connection.
+    """
+    with socket.create_server((host, port)) as server:
+        connection, _ = server.accept()
+        with connection, connection.makefile('r') as file:
+            yield from file
+
+
+def replay_lines(filepath, speed=1.0):
+    """Yields the lines of a recorded OpenFace CSV at the pace of their
+    timestamps, speed times faster than real time (as fast as possible when
+    speed is 0).
+    """
+    with open(filepath) as file:
+        header = file.readline()
+        yield header
+        column = [name.strip() for name in header.split(',')].index(
+            'timestamp')
+        t0 = clock0 = None
+        for line in file:
+            if speed > 0:
+                t = float(line.split(',', column + 1)[column])
+                if t0 is None:
+                    t0, clock0 = t, time.perf_counter()
+                delay = clock0 + (t - t0) / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            yield line
+
+
+def summarise_latencies(latencies):
+    """Summarises the processing time of the frames (in seconds) as the
+    median, 99th percentile and maximum in milliseconds.
+    """
+    if not latencies:
+        return {}
+    latencies = np.array(latencies) * 1000
+    return {'frames': len(latencies),
+            'median_ms': float(np.median(latencies)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'max_ms': float(latencies.max())}
+
+
+def run_stream(lines, models, window_size, step_size, demographics,
+               on_window, start_frame=None):
+    """Runs the inference on a stream of CSV lines (the header first): every
+    frame is added to the stream, and the windows it completes are predicted
+    in a worker thread and passed to on_window, with the predictions and the
+    time from their last frame to the prediction. Returns the processing time
+    of each frame (in seconds).
+    """
+    lines = iter(lines)
+    columns = get_input_columns(next(lines))
+    state = create_stream(window_size, step_size, start_frame)
+    latencies = []
+
+    def predict(window, start):
+        window['predictions'] = predict_window(models, window, demographics)
+        window['latency_ms'] = (time.perf_counter() - start) * 1000
+        on_window(window)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        for line in lines:
+            start = time.perf_counter()
+            values = np.array(line.split(','), dtype=float)[columns]
+            for window in push_frame(state, values):
+                executor.submit(predict, window, start)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def get_lines(tail_filepath, address, replay_filepath, speed):
+    """Gets the lines of the single source that was chosen."""
+    sources = [source for source in [tail_filepath, address, replay_filepath]
+               if source is not None]
+    if len(sources) != 1:
+        raise click.UsageError('Choose one of --tail, --listen and --replay')
+    if tail_filepath is not None:
+        return tail_lines(tail_filepath, idle_timeout=5)
+    if address is not None:
+        host, port = address.rsplit(':', 1)
+        return socket_lines(host, int(port))
+    return replay_lines(replay_filepath, speed)
+
+
+def write_window(file, window):
+    """Writes a window and its predictions as a line of JSON."""
+    window = {key: value for key, value in window.items()
+              if key != 'features'}
+    file.write(json.dumps(window, default=float) + '\n')
+    file.flush()
+
+
+@click.group()
+def cli():
+    """ Streaming inference of the stress models on OpenFace frames."""
+
+
+@cli.command()
+@click.argument('model_filepaths', nargs=-1, required=True,
+                type=click.Path(exists=True))
+@click.option('--tail', 'tail_filepath', type=click.Path(),
+              help='An OpenFace CSV file that is being written.')
+@click.option('--listen', 'address',
+              help='A local HOST:PORT to receive CSV lines on.')
+@click.option('--replay', 'replay_filepath', type=click.Path(exists=True),
+              help='A recorded OpenFace CSV to replay.')
+@click.option('--speed', default=1.0,
+              help='The replay speed (1 is real time, 0 as fast as '
+                   'possible).')
+@click.option('--step', 'step_size', default=1.0,
+              help='Seconds between two predictions.')
+@click.option('--start-frame', type=int,
+              help='The frame at which the speech component starts, so the '
+                   'windows are timed like t_from_start (default the first '
+                   'frame).')
+@click.option('--age', type=float, required=True,
+              help='The age of the participant.')
+@click.option('--sex', type=int, required=True,
+              help='The sex of the participant, coded as in '
+                   '5-ak-window-processing.')
+@click.option('--output', 'output_filepath', type=click.Path(),
+              help='A JSON lines file for the predictions (default stdout).')
+def stream(model_filepaths, tail_filepath, address, replay_filepath, speed,
+           step_size, start_frame, age, sex, output_filepath):
+    """ Predicts the stress targets every step from a stream of OpenFace
+        frames, with the models stored by 6-ak-modelling (in ../models).
+    """
+    logger = logging.getLogger(__name__)
+    models = load_models(model_filepaths)
+    window_size = max(model['window'] for model in models.values())
+    demographics = {'leeftijd': age, 'geslacht': sex}
+    lines = get_lines(tail_filepath, address, replay_filepath, speed)
+    logger.info(f'predicting {list(models)} on windows of {window_size} s')
+
+    file = (open(output_filepath, 'w') if output_filepath
+            else click.get_text_stream('stdout'))
+    try:
+        latencies = run_stream(lines, models, window_size, step_size,
+                               demographics,
+                               lambda window: write_window(file, window),
+                               start_frame)
+    finally:
+        if output_filepath:
+            file.close()
+    logger.info(f'latency per frame: {summarise_latencies(latencies)}')
+
+
+@cli.command()
+@click.argument('csv_filepath', type=click.Path(exists=True))
+@click.option('--file', 'output_filepath', type=click.Path(),
+              help='Append the lines to this file, for --tail.')
+@click.option('--socket', 'address',
+              help='Send the lines to this HOST:PORT, for --listen.')
+@click.option('--speed', default=1.0,
+              help='The replay speed (1 is real time, 0 as fast as '
+                   'possible).')
+def replay(csv_filepath, output_filepath, address, speed):
+    """ Replays a recorded OpenFace CSV to a file or a local socket at the
+        pace of its timestamps, as a stand-in for a running session.
+    """
+    if (output_filepath is None) == (address is None):
+        raise click.UsageError('Choose one of --file and --socket')
+    lines = replay_lines(csv_filepath, speed)
+    if output_filepath is not None:
+        with open(output_filepath, 'w') as file:
+            for line in lines:
+                file.write(line)
+                file.flush()
+    else:
+        host, port = address.rsplit(':', 1)
+        with socket.create_connection((host, int(port)), timeout=10) as out:
+            for line in lines:
+                out.sendall(line.encode())
+
+
+if __name__ == '__main__':
+    log_fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    # find .env automagically by walking up directories until it's found, then
+    # load up the .env entries as environment variables
+    load_dotenv(find_dotenv())
+
+    cli()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The scripts of the notebooks directory are imported by their module name,
+# as the notebooks do
+NOTEBOOKS_DIR = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'notebooks')
+if NOTEBOOKS_DIR not in sys.path:
+    sys.path.insert(0, NOTEBOOKS_DIR)
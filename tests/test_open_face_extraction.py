@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+
+import openFaceExtraction as ofe
+
+# A stand-in for OpenFace FeatureExtraction: it writes a csv file with a
+# frame per line of the video into the output directory and logs every call.
+# Videos whose name contains 'broken' fail like OpenFace does.
+STUB = '''
+import os
+import sys
+args = sys.argv[1:]
+video = args[args.index('-f') + 1]
+out_dir = args[args.index('-out_dir') + 1]
+with open(os.environ['STUB_LOG'], 'a') as f:
+    f.write(os.path.basename(video) + '\\n')
+if 'broken' in video:
+    sys.exit(1)
+name = os.path.splitext(os.path.basename(video))[0]
+with open(video) as f:
+    frames = f.read().split()
+with open(os.path.join(out_dir, name + '.csv'), 'w') as f:
+    f.write('frame, timestamp\\n')
+    for i, frame in enumerate(frames):
+        f.write(f'{i + 1}, {i / 25}\\n')
+'''
+
+
+def make_videos(tmp_path, videos):
+    video_dir = tmp_path / 'videos'
+    video_dir.mkdir()
+    for video, frames in videos.items():
+        (video_dir / video).write_text(' '.join(['frame'] * frames))
+    stub = tmp_path / 'FeatureExtraction.py'
+    stub.write_text(STUB)
+    return video_dir, [sys.executable, str(stub)]
+
+
+def read_log(log):
+    return log.read_text().split() if log.exists() else []
+
+
+def test_extract_videos_resumes_and_skips_done(tmp_path, monkeypatch):
+    video_dir, executable = make_videos(
+        tmp_path, {'1.mp4': 10, '2.mp4': 5, '3_broken.mp4': 3})
+    out_dir = tmp_path / 'features'
+    log = tmp_path / 'calls.log'
+    monkeypatch.setenv('STUB_LOG', str(log))
+
+    manifest = ofe.extract_videos(executable, str(video_dir), str(out_dir),
+                                  max_workers=2)
+    assert manifest['1.mp4']['status'] == 'done'
+    assert manifest['1.mp4']['frames'] == 10
+    assert manifest['2.mp4']['frames'] == 5
+    assert manifest['3_broken.mp4']['status'] == 'failed'
+    assert not (out_dir / '3_broken.csv').exists()
+    assert not [name for name in os.listdir(out_dir)
+                if name.endswith('.tmp')]
+    with open(out_dir / ofe.MANIFEST) as f:
+        assert json.load(f) == manifest
+
+    log.unlink()
+    manifest = ofe.extract_videos(executable, str(video_dir), str(out_dir))
+    assert read_log(log) == ['3_broken.mp4']  # Only the failed video again
+    assert manifest['1.mp4']['status'] == 'done'
+
+
+def test_extract_videos_imports_complete_csv_files(tmp_path, monkeypatch):
+    video_dir, executable = make_videos(tmp_path, {'1.mp4': 4, '2.mp4': 4})
+    out_dir = tmp_path / 'features'
+    out_dir.mkdir()
+    (out_dir / '1.csv').write_text('frame, timestamp\n1, 0.0\n2, 0.04\n')
+    (out_dir / '2.csv').write_text('frame, timestamp\n1, 0.0\n2, 0.')
+    log = tmp_path / 'calls.log'
+    monkeypatch.setenv('STUB_LOG', str(log))
+
+    manifest = ofe.extract_videos(executable, str(video_dir), str(out_dir))
+    assert read_log(log) == ['2.mp4']  # The incomplete csv is extracted again
+    assert manifest['1.mp4'] == {'status': 'done', 'imported': True,
+                                 'frames': 2}
+    assert manifest['2.mp4']['frames'] == 4
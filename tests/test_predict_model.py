@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+import sampling
+import syntheticData as sd
+from src.features import features as ft
+from src.models import predict_model as pm
+from windowing import get_bounds, get_start_end
+
+# The per window functions of features.py that the streaming inference uses
+FUNCTIONS = [ft.compute_mean_AUs, ft.compute_std_AUs, ft.compute_arousal,
+             ft.compute_emotions, ft.compute_head_motion,
+             ft.compute_PD_features]
+
+
+@pytest.mark.parametrize('window_size, step_size', [(60, 7), (180, 60)])
+def test_stream_matches_offline_windows(tmp_path, window_size, step_size):
+    video = sd.create_video(300, pp=1, seed=3, low_confidence=0.02)
+    filepath = tmp_path / 'video.csv'
+    video.to_csv(filepath, index=False)
+    lines = filepath.read_text().splitlines(True)
+    columns = pm.get_input_columns(lines[0])
+    start_frame = video.frame[video.t_from_start >= 0].iloc[0]
+    state = pm.create_stream(window_size, step_size, start_frame)
+    windows = []
+    for line in lines[1:]:
+        values = np.array(line.split(','), dtype=float)[columns]
+        windows += pm.push_frame(state, values)
+
+    points = get_start_end(video, window_size, step_size)
+    lower, upper = get_bounds(video.t_from_start.values, points)
+    assert len(windows) == len(points)
+    for (start, end), low, up, window in zip(points, lower, upper, windows):
+        assert (window['start'], window['end']) == pytest.approx((start, end))
+        assert window['frames'] == up - low
+        quality = (video.confidence.iloc[low:up]
+                   >= ft.CONFIDENCE_THRESHOLD).mean()
+        if quality < ft.MIN_GOOD_FRAMES:  # A removed window
+            assert window['features'] is None
+            continue
+        expected = {}
+        masked = sampling.mask_frames(video.iloc[low:up])
+        for function in FUNCTIONS:
+            expected.update(function(masked))
+        expected['blink_rate'] = ft.compute_blink_rate(masked)
+        assert window['features'].keys() == expected.keys()
+        for key, value in expected.items():
+            assert window['features'][key] == pytest.approx(
+                value, rel=1e-6, abs=1e-9, nan_ok=True), key
+
+
+@pytest.mark.parametrize('missing', ['--age', '--sex'])
+def test_stream_requires_demographics(tmp_path, missing):
+    filepath = tmp_path / 'model.joblib'
+    filepath.touch()
+    options = {'--age': '23', '--sex': '1'}
+    del options[missing]
+    args = ['stream', str(filepath), '--replay', str(filepath)]
+    for option, value in options.items():
+        args += [option, value]
+    result = CliRunner().invoke(pm.cli, args)
+    assert result.exit_code == 2
+    assert f"Missing option '{missing}'" in result.output
@@ -0,0 +1,53 @@
+import json
+import os
+
+import pytest
+
+import sampling
+import syntheticData as sd
+from src.features import paths
+from src.features import profiling as prof
+
+# The stages of the windows, which hold the stages of their groups
+WINDOW_STAGES = ['process_video_window', 'process_physio_window']
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    # A participant with a video, a physio recording and baseline statistics
+    monkeypatch.setitem(paths.settings, 'data_dir', None)
+    sd.create_baseline_files(str(tmp_path), [1], seed=0)
+    paths.set_data_dir(tmp_path)
+    for name, data in [('video', sd.create_video(150, pp=1, seed=0)),
+                       ('physio', sd.create_physio(150, pp=1, seed=0))]:
+        os.makedirs(tmp_path / name)
+        data.reset_index(drop=True).to_feather(tmp_path / name / '1.feather')
+    yield tmp_path
+    prof.take_records()
+
+
+@pytest.mark.parametrize('incremental', [False, True])
+def test_window_stages_are_profiled(data_dir, incremental):
+    prof.take_records()
+    sampled = sampling.sample_windows(
+        [1], str(data_dir / 'physio'), str(data_dir / 'video'), [(60, 60)],
+        max_workers=1, incremental=incremental, physio_once=incremental,
+        profile=True)
+    windows = len(sampled[(60, 60)][0])
+    assert windows > 0
+
+    summary = prof.summarise()
+    for stage in WINDOW_STAGES:
+        assert stage in summary.index
+    groups = {'process_video_window': sampling.VIDEO_GROUPS,
+              'process_physio_window': sampling.PHYSIO_GROUPS}
+    for stage, stage_groups in groups.items():
+        assert summary.loc[stage, 'calls'] == windows * len(stage_groups)
+
+    filepath = data_dir / 'trace.json'
+    prof.export_trace(filepath)
+    events = json.loads(filepath.read_text())['traceEvents']
+    names = {event['name'] for event in events}
+    assert set(WINDOW_STAGES) <= names
+    assert all(event['args']['pp'] == 1 for event in events
+               if event['name'] in WINDOW_STAGES)
@@ -0,0 +1,39 @@
+import pytest
+
+import sampling
+import syntheticData as sd
+from src.features import features as ft
+from src.features import slidingFeatures as sf
+from windowing import get_bounds, get_start_end
+
+# The per window functions of features.py that have an incremental version
+FUNCTIONS = ['compute_mean_AUs', 'compute_std_AUs', 'compute_emotions',
+             'compute_head_motion', 'compute_PD_features',
+             'compute_blink_rate']
+
+
+@pytest.fixture(scope='module')
+def video():
+    # Ten percent of the frames have a low confidence, so they are masked
+    video = sd.create_video(300, pp=1, seed=3, low_confidence=0.1)
+    masked = sampling.mask_frames(video)
+    assert masked['AU01_r'].isna().any()
+    return masked
+
+
+@pytest.mark.parametrize('window_size, step_size', [(60, 7), (180, 60)])
+@pytest.mark.parametrize('name', FUNCTIONS)
+def test_sliding_features_match_per_window(video, name, window_size,
+                                           step_size):
+    prepared = sf.prepare_video(video)
+    points = get_start_end(video, window_size, step_size)
+    lower, upper = get_bounds(video.t_from_start.values, points)
+    for low, up in zip(lower, upper):
+        expected = getattr(ft, name)(video.iloc[low:up])
+        result = getattr(sf, name)(prepared, low, up)
+        if not isinstance(expected, dict):  # compute_blink_rate
+            expected, result = {name: expected}, {name: result}
+        assert list(result) == list(expected)
+        for key, value in expected.items():
+            assert result[key] == pytest.approx(value, rel=1e-6, abs=1e-9,
+                                                nan_ok=True), key